@@ -0,0 +1,12 @@
+from das_binder.config import ConfigBase
+
+
+class Config(ConfigBase):
+
+    @property
+    def das_module_name(self):
+        return 'callOverheadBindings'
+
+    def configure_function(self, function):
+        function.set_side_effects('none')
+        function.set_fast_call(function.name.endswith('_fast'))
@@ -0,0 +1,10 @@
+#include "call_overhead.h"
+
+int32_t bench_add_ints(int32_t a, int32_t b) { return a + b; }
+int32_t bench_add_ints_fast(int32_t a, int32_t b) { return a + b; }
+
+float bench_madd(float a, float b, float c) { return a * b + c; }
+float bench_madd_fast(float a, float b, float c) { return a * b + c; }
+
+void bench_touch(int32_t * counter) { ++*counter; }
+void bench_touch_fast(int32_t * counter) { ++*counter; }
@@ -0,0 +1,13 @@
+#include <stdint.h>
+
+// Each pair has identical implementation, "_fast" ones are bound through
+// SimNode_DasBinderFastCall, see binding_config.py.
+
+int32_t bench_add_ints(int32_t a, int32_t b);
+int32_t bench_add_ints_fast(int32_t a, int32_t b);
+
+float bench_madd(float a, float b, float c);
+float bench_madd_fast(float a, float b, float c);
+
+void bench_touch(int32_t * counter);
+void bench_touch_fast(int32_t * counter);
@@ -0,0 +1,172 @@
+'''
+Generates bindings for scaled up copies of a header and compiles every
+generated part, recording compile time, peak compiler memory and object
+size per part.
+
+Compiles against a minimal das stub header (benchmarks/das_stub) by
+default, so numbers reflect cost of the generated code itself. Use
+--das_include_dir to compile against real daScript headers instead.
+'''
+import argparse
+import json
+import os
+import re
+import subprocess
+import sys
+import time
+from os import path
+
+
+BENCHMARKS_DIR = path.dirname(path.abspath(__file__))
+REPO_DIR = path.dirname(BENCHMARKS_DIR)
+MAIN_PY = path.join(REPO_DIR, 'python_modules', 'das_binder', 'main.py')
+EXAMPLE_DIR = path.join(REPO_DIR, 'examples', 'test')
+
+
+def scale_header(text, copies):
+    '''
+    Repeats header body "copies" times, renaming declared enums, structs,
+    enum constants, typedefs and function prototypes in each copy.
+
+    >>> print(scale_header('#include <a.h>\\nenum E {\\n    E_a = 0\\n};\\n', 2))
+    #include <a.h>
+    enum E_0 {
+        E_a_0 = 0
+    };
+    enum E_1 {
+        E_a_1 = 0
+    };
+    <BLANKLINE>
+    '''
+    lines = text.splitlines(keepends=True)
+    preamble = ''.join(l for l in lines if l.startswith('#include'))
+    body = ''.join(l for l in lines if not l.startswith('#include'))
+    names = set(re.findall(r'\b(?:enum|struct|union)\s+(\w+)', body))
+    names |= set(re.findall(r'^[\s,]*(\w+)\s*=', body, re.MULTILINE))
+    names |= set(re.findall(r'\btypedef\b[^;]*?\b(\w+)\s*;', body))
+    names |= set(re.findall(r'^[\w\s*]*?\b(\w+)\s*\([^;{]*\)\s*;', body,
+        re.MULTILINE))
+    if not names:
+        return preamble + body * copies
+    regex = re.compile(r'\b(' + '|'.join(map(re.escape, sorted(names))) +
+        r')\b')
+    return preamble + ''.join(regex.sub(lambda m: f'{m.group(1)}_{i}', body)
+        for i in range(copies))
+
+def run_measured(cmd, cwd=None):
+    '''Returns wall time and peak RSS (in KiB) of a child process.'''
+    start = time.perf_counter()
+    proc = subprocess.Popen(cmd, cwd=cwd, stdout=subprocess.PIPE,
+        stderr=subprocess.STDOUT)
+    output = proc.stdout.read()
+    _, status, rusage = os.wait4(proc.pid, 0)
+    elapsed = time.perf_counter() - start
+    proc.returncode = os.waitstatus_to_exitcode(status)
+    if proc.returncode != 0:
+        raise RuntimeError(f'Command failed: {" ".join(cmd)}\n'
+            f'{output.decode(errors="replace")}')
+    return elapsed, rusage.ru_maxrss
+
+def write_file(fpath, content):
+    with open(fpath, 'w') as f:
+        f.write(content)
+
+def generate(args, work_dpath, copies):
+    os.makedirs(work_dpath, exist_ok=True)
+    with open(args.header, 'r') as f:
+        header = scale_header(f.read(), copies)
+    header_fpath = path.join(work_dpath, 'header.h')
+    write_file(header_fpath, header)
+    module_h_fpath = path.join(work_dpath, 'module.h')
+    write_file(module_h_fpath,
+        '#include "daScript/daScript.h"\n'
+        '#include "header.h"\n'
+        '#include "generated.h.inc"\n')
+    write_file(path.join(work_dpath, 'module.cpp'),
+        '#include "module.h"\n'
+        'using namespace das;\n'
+        '#include "generated.cpp.inc"\n')
+    cmd = [sys.executable, '-B', MAIN_PY, '--skip_self_tests',
+        '--c_header_from', header_fpath,
+        '--num_parts', str(args.num_parts),
+        '--module_cpp_prefix', path.join(work_dpath, 'generated'),
+        '--module_h_inc_to', path.join(work_dpath, 'generated.h.inc'),
+        '--module_h', module_h_fpath,
+        '--config', args.config,
+        '--clang_c_exe', args.clang_c_exe,
+        '--include_dirs', '',
+        '--log_level', 'warning',
+    ]
+    elapsed, _ = run_measured(cmd)
+    return elapsed
+
+def compile_parts(args, work_dpath):
+    sources = ['module.cpp'] + [f'generated_{part}.cpp'
+        for part in range(args.num_parts)]
+    results = []
+    for source in sources:
+        obj = source[:-len('.cpp')] + '.o'
+        cmd = [args.compiler, '-c', source, '-o', obj,
+            f'-std={args.std}', *args.cxx_flags.split(),
+            f'-I{args.das_include_dir}', f'-I{work_dpath}',
+            f'-I{path.dirname(path.abspath(args.header))}']
+        elapsed, max_rss = run_measured(cmd, cwd=work_dpath)
+        results.append({
+            'source': source,
+            'seconds': elapsed,
+            'peak_rss_kib': max_rss,
+            'object_bytes': path.getsize(path.join(work_dpath, obj)),
+        })
+    return results
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--header',
+        default=path.join(EXAMPLE_DIR, 'header_to_bind.h'),
+        help='Header to scale. Default: %(default)s')
+    parser.add_argument('--config',
+        default=path.join(EXAMPLE_DIR, 'binding_config.py'),
+        help='Binding config. Default: %(default)s')
+    parser.add_argument('--scales', type=str, default='1,10,100',
+        help='Comma separated numbers of header copies. '
+            'Default: %(default)s')
+    parser.add_argument('--num_parts', type=int, default=4,
+        help='Number of generated parts. Default: %(default)s')
+    parser.add_argument('--work_dir', default='compile_time_work',
+        help='Where to put generated files. Default: %(default)s')
+    parser.add_argument('--clang_c_exe', default='clang',
+        help='Clang to generate AST with. Default: %(default)s')
+    parser.add_argument('--compiler', default='clang++',
+        help='C++ compiler to measure. Default: %(default)s')
+    parser.add_argument('--std', default='c++17',
+        help='C++ standard. Default: %(default)s')
+    parser.add_argument('--cxx_flags', default='-O2',
+        help='Extra compiler flags. Default: %(default)s')
+    parser.add_argument('--das_include_dir',
+        default=path.join(BENCHMARKS_DIR, 'das_stub'),
+        help='daScript include directory. Default: minimal stub.')
+    parser.add_argument('--json_to',
+        help='Also write results as JSON to this file.')
+    args = parser.parse_args(argv)
+    args.header = path.abspath(args.header)
+    args.config = path.abspath(args.config)
+    args.das_include_dir = path.abspath(args.das_include_dir)
+
+    all_results = []
+    for copies in map(int, args.scales.split(',')):
+        work_dpath = path.abspath(path.join(args.work_dir, f'x{copies}'))
+        generate_seconds = generate(args, work_dpath, copies)
+        parts = compile_parts(args, work_dpath)
+        all_results.append({'copies': copies,
+            'generate_seconds': generate_seconds, 'parts': parts})
+        print(f'x{copies}: generated in {generate_seconds:.2f} s')
+        for part in parts:
+            print(f'    {part["source"]:>20}: {part["seconds"]:7.2f} s, '
+                f'{part["peak_rss_kib"] / 1024:8.1f} MiB peak, '
+                f'{part["object_bytes"] / 1024:8.1f} KiB object')
+    if args.json_to:
+        write_file(args.json_to, json.dumps(all_results, indent=4))
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
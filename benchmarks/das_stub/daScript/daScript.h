@@ -0,0 +1,246 @@
+// Minimal stand-in for daScript headers, declaring just enough of the
+// API for generated bindings to compile. Used by compile_time.py to
+// measure cost of generated code itself. Nothing here is functional.
+#pragma once
+
+#include <stdint.h>
+#include <stddef.h>
+#include <string.h>
+#include <string>
+#include <memory>
+#include <utility>
+#include <type_traits>
+
+#ifndef _MSC_VER
+#define __forceinline inline __attribute__((always_inline))
+#endif
+
+struct vec4f { float x, y, z, w; };
+inline vec4f v_zero() { return vec4f{0, 0, 0, 0}; }
+
+#define DAS_PROFILE_NODE
+
+namespace das {
+
+    using std::string;
+
+    template <typename T> using smart_ptr = std::shared_ptr<T>;
+    template <typename T, typename ...Args>
+    smart_ptr<T> make_smart(Args && ...args) {
+        return std::make_shared<T>(std::forward<Args>(args)...);
+    }
+
+    enum class Type { none, tInt, tUInt, tInt64, tUInt64, tFloat, tDouble };
+
+    template <typename T> struct ToBasicType { enum { type = int(Type::tInt) }; };
+    template <typename T> struct underlying_type {
+        typedef typename std::underlying_type<T>::type type;
+    };
+
+    struct LineInfo {};
+    struct TypeDecl {};
+    typedef smart_ptr<TypeDecl> TypeDeclPtr;
+
+    struct Context;
+
+    struct SimNode {
+        SimNode(const LineInfo & a) : at(a) {}
+        virtual ~SimNode() {}
+        virtual vec4f eval(Context &) { return v_zero(); }
+        virtual char * evalPtr(Context &) { return nullptr; }
+        virtual int32_t evalInt(Context &) { return 0; }
+        virtual float evalFloat(Context &) { return 0; }
+        LineInfo at;
+    };
+
+    struct NodeAllocator {
+        template <typename T, typename ...Args>
+        T * makeNode(Args && ...args) { return new T(std::forward<Args>(args)...); }
+    };
+
+    struct StringHeapAllocator {
+        char * allocateString(const char * text, uint32_t length) {
+            char * str = new char[length + 1];
+            memcpy(str, text, length);
+            str[length] = 0;
+            return str;
+        }
+    };
+
+    struct Context {
+        smart_ptr<NodeAllocator> code;
+        smart_ptr<StringHeapAllocator> stringHeap;
+    };
+
+    template <typename T> struct cast {
+        static T to(vec4f) { return T(); }
+        static vec4f from(T) { return v_zero(); }
+    };
+    template <typename T> struct cast_enum : cast<int32_t> {};
+
+    template <typename T> struct EvalTT {
+        static __forceinline T eval(Context & context, SimNode * node) {
+            return cast<T>::to(node->eval(context));
+        }
+    };
+    template <> struct EvalTT<int32_t> {
+        static __forceinline int32_t eval(Context & context, SimNode * node) {
+            return node->evalInt(context);
+        }
+    };
+    template <> struct EvalTT<float> {
+        static __forceinline float eval(Context & context, SimNode * node) {
+            return node->evalFloat(context);
+        }
+    };
+
+    struct SimNode_CopyRefValue : SimNode {
+        SimNode_CopyRefValue(const LineInfo & at, SimNode * ll, SimNode * rr, uint32_t sz)
+            : SimNode(at), l(ll), r(rr), size(sz) {}
+        virtual vec4f eval(Context & context) override {
+            memcpy(l->evalPtr(context), r->evalPtr(context), size);
+            return v_zero();
+        }
+        SimNode * l, * r;
+        uint32_t size;
+    };
+
+    struct SimNode_CallBase : SimNode {
+        SimNode_CallBase(const LineInfo & at, const char * name)
+            : SimNode(at), fnName(name) {}
+        const char * fnName;
+        SimNode ** arguments = nullptr;
+    };
+
+    template <typename FuncT, FuncT fn>
+    struct SimNode_ExtFuncCall : SimNode_CallBase {
+        SimNode_ExtFuncCall(const LineInfo & at, const char * name)
+            : SimNode_CallBase(at, name) {}
+    };
+
+    enum class SideEffects {
+        none, unsafe, userScenario, modifyExternal, accessExternal,
+        modifyArgument, accessGlobal, invoke, worstDefault,
+        modifyArgumentAndExternal, modifyArgumentAndAccessExternal,
+    };
+
+    struct Expression {
+        virtual ~Expression() {}
+        virtual SimNode * simulate(Context &) const { return nullptr; }
+    };
+    typedef smart_ptr<Expression> ExpressionPtr;
+
+    struct Annotation {
+        virtual ~Annotation() {}
+    };
+    typedef smart_ptr<Annotation> AnnotationPtr;
+
+    struct Enumeration {
+        Enumeration(const string & n) : name(n) {}
+        void addI(const string &, int64_t, const LineInfo &) {}
+        string name;
+        string cppName;
+        bool external = false;
+        Type baseType = Type::tInt;
+    };
+    typedef smart_ptr<Enumeration> EnumerationPtr;
+
+    struct ModuleLibrary {
+        TypeDeclPtr makeEnumType(const string &) const { return TypeDeclPtr(); }
+        TypeDeclPtr makeHandleType(const string &) const { return TypeDeclPtr(); }
+    };
+
+    struct Module {
+        Module(const string & n) : name(n) {}
+        virtual ~Module() {}
+        bool addAnnotation(const AnnotationPtr &) { return true; }
+        bool addEnumeration(const EnumerationPtr &) { return true; }
+        void addBuiltinDependency(ModuleLibrary &, Module *, bool = false) {}
+        static Module * require(const string &) { return nullptr; }
+        string name;
+    };
+
+    template <typename T> struct typeFactory {
+        static TypeDeclPtr make(const ModuleLibrary &) { return TypeDeclPtr(); }
+    };
+    template <typename T> TypeDeclPtr makeType(const ModuleLibrary & lib) {
+        return typeFactory<T>::make(lib);
+    }
+
+    template <typename T> struct TypeAnnotation : Annotation {
+        virtual bool isLocal() const { return false; }
+        virtual bool canCopy() const { return false; }
+        virtual bool canMove() const { return false; }
+        virtual bool canClone() const { return false; }
+        virtual SimNode * simulateCopy(Context &, const LineInfo &, SimNode *, SimNode *) const {
+            return nullptr;
+        }
+        virtual SimNode * simulateClone(Context &, const LineInfo &, SimNode *, SimNode *) const {
+            return nullptr;
+        }
+        virtual TypeDeclPtr makeFieldType(const string &, bool) const { return TypeDeclPtr(); }
+        virtual SimNode * simulateGetField(const string &, Context &, const LineInfo &, const ExpressionPtr &) const {
+            return nullptr;
+        }
+        virtual SimNode * simulateGetFieldR2V(const string &, Context &, const LineInfo &, const ExpressionPtr &) const {
+            return nullptr;
+        }
+    };
+
+    template <typename OT, bool canNew = true, bool canDelete = canNew>
+    struct ManagedStructureAnnotation : TypeAnnotation<OT> {
+        typedef OT ManagedType;
+        ManagedStructureAnnotation(const string & n, ModuleLibrary & ml)
+            : name(n), mlib(&ml) {}
+        template <typename FT, size_t offset>
+        void addField(const string &, const string & = "") {}
+        uint32_t getSizeOf() const { return uint32_t(sizeof(OT)); }
+        virtual TypeDeclPtr makeFieldType(const string &, bool) const override { return TypeDeclPtr(); }
+        virtual SimNode * simulateGetField(const string &, Context &, const LineInfo &, const ExpressionPtr &) const override {
+            return nullptr;
+        }
+        virtual SimNode * simulateGetFieldR2V(const string &, Context &, const LineInfo &, const ExpressionPtr &) const override {
+            return nullptr;
+        }
+        string name;
+        ModuleLibrary * mlib;
+    };
+
+    template <typename OT>
+    struct ManagedValueAnnotation : TypeAnnotation<OT> {
+        ManagedValueAnnotation(const string & n, const string & cppn)
+            : name(n), cppName(cppn) {}
+        string name, cppName;
+    };
+
+    template <typename FuncT, FuncT fn,
+        template <typename FuncTT, FuncTT fnt> class SimNodeT = SimNode_ExtFuncCall>
+    inline void addExtern(Module & mod, const ModuleLibrary &, const string & name,
+        SideEffects, const char * = nullptr
+    ) {
+        // instantiate the node type, as the real addExtern does
+        SimNodeT<FuncT, fn> node(LineInfo(), name.c_str());
+        (void) node;
+        (void) mod;
+    }
+
+    template <typename T>
+    inline void addConstant(Module &, const string &, const T &) {}
+}
+
+#define DAS_BIND_FUN(a) decltype(&a), a
+#define DAS_BIND_MANAGED_FIELD(FIELDNAME) \
+    decltype(ManagedType::FIELDNAME), offsetof(ManagedType, FIELDNAME)
+
+#define MAKE_EXTERNAL_TYPE_FACTORY(TYPE, CTYPE) \
+    namespace das { \
+        template <> struct typeFactory<CTYPE> { \
+            static TypeDeclPtr make(const ModuleLibrary & lib); \
+        }; \
+    }
+#define IMPLEMENT_EXTERNAL_TYPE_FACTORY(TYPE, CTYPE) \
+    namespace das { \
+        TypeDeclPtr typeFactory<CTYPE>::make(const ModuleLibrary & lib) { \
+            return lib.makeHandleType(#TYPE); \
+        } \
+    }
@@ -0,0 +1,167 @@
+'''
+Runs the whole binder on synthetic ASTs with growing numbers of top level
+decls and fails if time per decl grows faster than allowed, or if peak
+memory goes over budget. Catches accidental quadratic paths in parsing,
+classification and code generation.
+
+Every size runs in a separate process from a pruned AST snapshot, so
+clang is not needed and peak RSS of one size does not leak into the next.
+'''
+import argparse
+import json
+import os
+import sys
+from os import path
+
+from compile_time import EXAMPLE_DIR, MAIN_PY, run_measured, write_file
+
+
+def synthetic_ast(num_decls):
+    '''
+    Returns pruned AST with num_decls top level decls: enums, structs
+    (plain and with bit fields), opaque structs with handle typedefs and
+    functions using all of them.
+
+    >>> root = synthetic_ast(20)
+    >>> len(root['inner'])
+    20
+    >>> sorted(set(decl['kind'] for decl in root['inner']))
+    ['EnumDecl', 'FunctionDecl', 'RecordDecl', 'TypedefDecl']
+    '''
+    ids = iter(range(1, 1 << 62))
+    def node(kind, name, **kwargs):
+        return dict(id=hex(next(ids)), kind=kind, name=name, **kwargs)
+    def field(name, qual_type, **kwargs):
+        return node('FieldDecl', name, type={'qualType': qual_type},
+            **kwargs)
+    def function(name, result, params):
+        qual_type = f'{result} ({", ".join(t for _, t in params)})'
+        return node('FunctionDecl', name, type={'qualType': qual_type},
+            inner=[node('ParmVarDecl', n, type={'qualType': t})
+                for n, t in params])
+    def group(i):
+        handle = f'Handle{i}'
+        return [
+            node('EnumDecl', f'Enum{i}', inner=[
+                node('EnumConstantDecl', f'Enum{i}_{value}',
+                    type={'qualType': 'int'})
+                for value in ['zero', 'one', 'two']]),
+            node('RecordDecl', f'Data{i}_T', tagUsed='struct'),
+            node('TypedefDecl', handle,
+                type={'qualType': f'struct Data{i}_T *'}),
+            node('RecordDecl', f'Struct{i}', tagUsed='struct',
+                completeDefinition=True, inner=[
+                    field('int_field', 'int'),
+                    field('float_field', 'float'),
+                    field('name', 'char [16]'),
+                    field('handle', handle),
+                ]),
+            node('RecordDecl', f'Flags{i}', tagUsed='struct',
+                completeDefinition=True, inner=[
+                    field('low', 'unsigned int', isBitfield=True),
+                    field('high', 'unsigned int', isBitfield=True),
+                ]),
+            function(f'create{i}', handle, [('value', f'enum Enum{i}')]),
+            function(f'fill{i}', 'void',
+                [('handle', handle), ('s', f'struct Struct{i} *')]),
+            function(f'sum{i}', 'int', [('a', 'int'), ('b', 'float')]),
+        ]
+    inner = []
+    i = 0
+    while len(inner) < num_decls:
+        inner += group(i)
+        i += 1
+    return {'kind': 'TranslationUnitDecl', 'inner': inner[:num_decls]}
+
+def generate(args, work_dpath, num_decls):
+    '''Returns wall time and peak RSS (in KiB) of one binder run.'''
+    os.makedirs(work_dpath, exist_ok=True)
+    ast_fpath = path.join(work_dpath, 'ast.json')
+    write_file(ast_fpath, json.dumps(synthetic_ast(num_decls),
+        separators=(',', ':')))
+    header_fpath = path.join(work_dpath, 'header.h')
+    write_file(header_fpath, '')
+    cmd = [sys.executable, '-B', MAIN_PY, '--skip_self_tests',
+        '--ast_from', ast_fpath,
+        '--c_header_from', header_fpath,
+        '--num_parts', str(args.num_parts),
+        '--module_cpp_prefix', path.join(work_dpath, 'generated'),
+        '--module_h_inc_to', path.join(work_dpath, 'generated.h.inc'),
+        '--module_h', path.join(work_dpath, 'module.h'),
+        '--config', args.config,
+        '--include_dirs', '',
+        '--log_level', 'warning',
+    ]
+    return run_measured(cmd)
+
+def check_budgets(args, results):
+    '''Returns list of budget violations.'''
+    failures = []
+    base = results[0]
+    base_rate = base['seconds'] / base['decls']
+    for result in results:
+        rss_mib = result['peak_rss_kib'] / 1024
+        rss_budget_mib = (args.rss_base_mib
+            + args.rss_kib_per_decl * result['decls'] / 1024)
+        if rss_mib > rss_budget_mib:
+            failures.append(f'{result["decls"]} decls: peak RSS '
+                f'{rss_mib:.1f} MiB is over budget of '
+                f'{rss_budget_mib:.1f} MiB')
+        if args.max_seconds_per_kdecl is not None:
+            seconds_per_kdecl = result['seconds'] * 1000 / result['decls']
+            if seconds_per_kdecl > args.max_seconds_per_kdecl:
+                failures.append(f'{result["decls"]} decls: '
+                    f'{seconds_per_kdecl:.3f} s per 1k decls is over '
+                    f'budget of {args.max_seconds_per_kdecl:.3f} s')
+        growth = result['seconds'] / result['decls'] / base_rate
+        if growth > args.max_time_growth:
+            failures.append(f'{result["decls"]} decls: time per decl is '
+                f'{growth:.2f}x of {base["decls"]} decls, more than '
+                f'allowed {args.max_time_growth:.2f}x')
+    return failures
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--config',
+        default=path.join(EXAMPLE_DIR, 'binding_config.py'),
+        help='Binding config. Default: %(default)s')
+    parser.add_argument('--sizes', type=str, default='10000,100000,500000',
+        help='Comma separated numbers of top level decls, smallest first. '
+            'Default: %(default)s')
+    parser.add_argument('--num_parts', type=int, default=20,
+        help='Number of generated parts. Default: %(default)s')
+    parser.add_argument('--max_time_growth', type=float, default=2.0,
+        help='How many times time per decl may grow compared to the '
+            'smallest size. Default: %(default)s')
+    parser.add_argument('--max_seconds_per_kdecl', type=float,
+        help='Optional absolute budget of seconds per 1000 decls.')
+    parser.add_argument('--rss_base_mib', type=float, default=64,
+        help='Peak RSS budget, fixed part. Default: %(default)s')
+    parser.add_argument('--rss_kib_per_decl', type=float, default=4,
+        help='Peak RSS budget, part per decl. Default: %(default)s')
+    parser.add_argument('--work_dir', default='scale_stress_work',
+        help='Where to put generated files. Default: %(default)s')
+    parser.add_argument('--json_to',
+        help='Also write results as JSON to this file.')
+    args = parser.parse_args(argv)
+    args.config = path.abspath(args.config)
+
+    results = []
+    for num_decls in map(int, args.sizes.split(',')):
+        work_dpath = path.abspath(path.join(args.work_dir, f'n{num_decls}'))
+        elapsed, max_rss = generate(args, work_dpath, num_decls)
+        results.append({'decls': num_decls, 'seconds': elapsed,
+            'peak_rss_kib': max_rss})
+        print(f'{num_decls:>8} decls: {elapsed:8.2f} s, '
+            f'{elapsed * 1000 / num_decls:6.3f} s per 1k decls, '
+            f'{max_rss / 1024:8.1f} MiB peak')
+    if args.json_to:
+        write_file(args.json_to, json.dumps(results, indent=4))
+    failures = check_budgets(args, results)
+    for failure in failures:
+        print(f'FAILED: {failure}')
+    return 1 if failures else 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
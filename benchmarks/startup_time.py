@@ -0,0 +1,50 @@
+'''
+Measures how long it takes to start the binder.
+
+By default runs "main.py --help", which covers interpreter startup,
+imports and (unless skipped) self tests. Pass real binder arguments
+after "--" to time complete runs instead, e.g. to see the effect of the
+compiled config cache (--config_cache_to).
+'''
+import argparse
+import subprocess
+import statistics
+import sys
+import time
+from os import path
+
+
+MAIN_PY = path.join(path.dirname(__file__), '..',
+    'python_modules', 'das_binder', 'main.py')
+
+
+def time_runs(cmd, runs):
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(cmd, check=True, stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL)
+        timings.append(time.perf_counter() - start)
+    return timings
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--runs', type=int, default=20,
+        help='Number of runs per mode. Default: %(default)s')
+    parser.add_argument('binder_args', nargs='*', default=['--help'],
+        help='Arguments to pass to main.py. Default: --help')
+    args = parser.parse_args(argv)
+
+    base_cmd = [sys.executable, '-B', MAIN_PY] + args.binder_args
+    modes = [
+        ('with self tests', base_cmd),
+        ('--skip_self_tests', base_cmd + ['--skip_self_tests']),
+    ]
+    for name, cmd in modes:
+        timings = time_runs(cmd, args.runs)
+        print(f'{name:>20}: min {min(timings) * 1000:7.1f} ms, '
+            f'median {statistics.median(timings) * 1000:7.1f} ms')
+
+if __name__ == '__main__':
+    main(sys.argv[1:])
@@ -1,14 +1,70 @@
 import logging
-from pprint import pformat
 from contextlib import contextmanager
 
+MAX_SUMMARY_DEPTH = 3
+MAX_SUMMARY_ITEMS = 8
+MAX_SUMMARY_STR = 200
+
+_logger = logging.getLogger('das_shared.diag')
+
+
+class Summary(str):
+    '''Already summarized text, printed as is.'''
+    pass
+
 
 @contextmanager
 def log_on_exception(**kwargs):
     try:
         yield
     except Exception:
-        logging.error('Exception occurred in the following context:\n' +
-            pformat(kwargs))
+        log_exception_context(**kwargs)
         raise
 
+def log_exception_context(**kwargs):
+    '''Same as log_on_exception, for use in hot loops where
+    a context manager per iteration is too expensive.'''
+    if not _logger.isEnabledFor(logging.ERROR):
+        return
+    _logger.error('Exception occurred in the following context:\n%s',
+        '\n'.join(f'{key}: {summarize(value)}'
+            for key, value in kwargs.items()))
+
+def summarize(value, depth=0):
+    '''
+    Short repr of value: nested containers and strings are truncated,
+    AST nodes keep only identifying keys.
+
+    >>> summarize({'kind': 'FunctionDecl', 'name': 'f', 'loc': {},
+    ...     'inner': [{'kind': 'ParmVarDecl'}] * 20})
+    "{'kind': 'FunctionDecl', 'name': 'f', 'inner': <20 items>}"
+    >>> summarize(list(range(10)))
+    '[0, 1, 2, 3, 4, 5, 6, 7, ... 2 more]'
+    '''
+    if isinstance(value, dict):
+        if 'kind' in value:
+            value = {key: value[key] for key in
+                ['kind', 'name', 'id', 'type', 'inner'] if key in value}
+            if 'inner' in value:
+                value['inner'] = Summary(f'<{len(value["inner"])} items>')
+        if depth >= MAX_SUMMARY_DEPTH:
+            return f'<dict of {len(value)} items>'
+        items = [f'{key!r}: {summarize(item, depth + 1)}' for key, item
+            in list(value.items())[:MAX_SUMMARY_ITEMS]]
+        if len(value) > MAX_SUMMARY_ITEMS:
+            items.append(f'... {len(value) - MAX_SUMMARY_ITEMS} more')
+        return '{' + ', '.join(items) + '}'
+    if isinstance(value, (list, tuple)):
+        if depth >= MAX_SUMMARY_DEPTH:
+            return f'<{len(value)} items>'
+        items = [summarize(item, depth + 1)
+            for item in value[:MAX_SUMMARY_ITEMS]]
+        if len(value) > MAX_SUMMARY_ITEMS:
+            items.append(f'... {len(value) - MAX_SUMMARY_ITEMS} more')
+        return '[' + ', '.join(items) + ']'
+    if isinstance(value, Summary):
+        return str(value)
+    text = repr(value)
+    if len(text) > MAX_SUMMARY_STR:
+        text = text[:MAX_SUMMARY_STR] + '...'
+    return text
@@ -2,24 +2,28 @@ import logging
 
 
 class LoggingObject(object):
+    '''
+    Logs through one logger per class and _log_namespaces, so long lived
+    processes do not collect a logger per object. Messages take lazy
+    %-style arguments, formatted only if the level is enabled.
+    '''
 
-    def _log_info(self, msg):
-        self.__log(level='info', msg=msg)
+    def _log_info(self, msg, *args):
+        self.__log(logging.INFO, msg, args)
 
-    def _log_debug(self, msg):
-        self.__log(level='debug', msg=msg)
+    def _log_debug(self, msg, *args):
+        self.__log(logging.DEBUG, msg, args)
 
     @property
     def _log_namespaces(self):
         return []
 
     @property
-    def __logger_id(self):
-        return '.'.join(map(str,
-            [self.__class__.__name__] + self._log_namespaces +
-            [f'obj_{id(self)}']))
+    def __logger(self):
+        return logging.getLogger('.'.join(map(str,
+            [self.__class__.__name__] + self._log_namespaces)))
 
-    def __log(self, level, msg):
-        logger = logging.getLogger(self.__logger_id)
-        log_fn = getattr(logger, level)
-        log_fn(msg)
+    def __log(self, level, msg, args):
+        logger = self.__logger
+        if logger.isEnabledFor(level):
+            logger.log(level, msg, *args)
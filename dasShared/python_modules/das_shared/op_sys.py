@@ -37,6 +37,23 @@ def write_to_file(fpath, content):
     with open(fpath, 'w') as f:
         f.write(content)
 
+def write_lines_to_file(fpath, lines):
+    '''Writes lines as they are produced, without joining them first.
+    Lines go to a temporary file next to fpath, which replaces fpath only
+    when all lines are written, so a failure leaves fpath untouched.'''
+    make_dirs(path.dirname(fpath))
+    tmp_fpath = f'{fpath}.{os.getpid()}.tmp'
+    try:
+        with open(tmp_fpath, 'w') as f:
+            for line in lines:
+                f.write(line)
+                f.write('\n')
+        os.replace(tmp_fpath, fpath)
+    except BaseException:
+        if path.exists(tmp_fpath):
+            os.remove(tmp_fpath)
+        raise
+
 def run_exec(cmd, raise_on_error=True):
     result = subprocess.run(cmd, shell=False, capture_output=True)
     stdout = result.stdout.decode()
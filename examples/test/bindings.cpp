@@ -1,7 +1,17 @@
-#include "daScript/daScript.h"
-
-#include "header_to_bind.h"
+#include "bindings.h"
 
 using namespace das;
 
-#include "bindings_generated.inc"
+#include "bindings_generated.cpp.inc"
+
+class Module_generatedBindings : public GeneratedModule_generatedBindings {
+public:
+    Module_generatedBindings() {
+        ModuleLibrary lib;
+        lib.addModule(this);
+        lib.addBuiltInModule();
+        addGenerated(lib);
+    }
+};
+
+REGISTER_MODULE(Module_generatedBindings);
@@ -0,0 +1,7 @@
+#pragma once
+
+#include "daScript/daScript.h"
+
+#include "header_to_bind.h"
+
+#include "bindings_generated.h.inc"
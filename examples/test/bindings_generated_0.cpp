@@ -0,0 +1,262 @@
+// generated by dasBinder
+#include "bindings.h"
+
+using namespace das;
+
+#if defined(_MSC_VER)
+#pragma warning(push)
+#pragma warning(disable:4100)   // unreferenced formal parameter
+#endif
+#if defined(__GNUC__) && !defined(__clang__)
+#pragma GCC diagnostic push
+#pragma GCC diagnostic ignored "-Wunused-parameter"
+#endif
+#if defined(__clang__)
+#pragma clang diagnostic push
+#pragma clang diagnostic ignored "-Wunused-parameter"
+#endif
+
+//
+// opaque structs
+//
+
+IMPLEMENT_EXTERNAL_TYPE_FACTORY(SomeOpaqueHandle, SomeOpaqueHandle)
+__forceinline bool SomeOpaqueHandle_equ(SomeOpaqueHandle a, SomeOpaqueHandle b) { return a == b; }
+__forceinline bool SomeOpaqueHandle_nequ(SomeOpaqueHandle a, SomeOpaqueHandle b) { return a != b; }
+__forceinline bool SomeOpaqueHandle_is_null(SomeOpaqueHandle a) { return a == nullptr; }
+
+//
+// structs
+//
+
+
+IMPLEMENT_EXTERNAL_TYPE_FACTORY(FirstStruct, FirstStruct);
+
+struct FirstStructAnnotation
+: public ManagedStructureAnnotation<FirstStruct,true,true> {
+    FirstStructAnnotation(ModuleLibrary & ml)
+    : ManagedStructureAnnotation ("FirstStruct", ml) {
+        addField<DAS_BIND_MANAGED_FIELD(bool_field)>("bool_field");
+        addField<DAS_BIND_MANAGED_FIELD(int_field)>("int_field");
+        addField<DAS_BIND_MANAGED_FIELD(float_field)>("float_field");
+    }
+    void init() {
+    }
+    virtual bool isLocal() const override { return true; }
+    virtual bool canCopy() const override { return true; }
+    virtual bool canMove() const override { return true; }
+    virtual bool canClone() const override { return true; }
+    virtual SimNode * simulateCopy ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {
+        return DasBinderCopy<FirstStruct>::make(context, at, l, r);
+    }
+    virtual SimNode * simulateClone ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {
+        return simulateCopy(context, at, l, r);
+    }
+};
+
+IMPLEMENT_EXTERNAL_TYPE_FACTORY(SecondStruct, SecondStruct);
+
+struct SecondStructAnnotation
+: public ManagedStructureAnnotation<SecondStruct,true,true> {
+    SecondStructAnnotation(ModuleLibrary & ml)
+    : ManagedStructureAnnotation ("SecondStruct", ml) {
+        addField<DAS_BIND_MANAGED_FIELD(bool_field)>("bool_field");
+        addField<DAS_BIND_MANAGED_FIELD(int_field)>("int_field");
+        addField<DAS_BIND_MANAGED_FIELD(float_field)>("float_field");
+    }
+    void init() {
+    }
+    virtual bool isLocal() const override { return true; }
+    virtual bool canCopy() const override { return true; }
+    virtual bool canMove() const override { return true; }
+    virtual bool canClone() const override { return true; }
+    virtual SimNode * simulateCopy ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {
+        return DasBinderCopy<SecondStruct>::make(context, at, l, r);
+    }
+    virtual SimNode * simulateClone ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {
+        return simulateCopy(context, at, l, r);
+    }
+};
+
+IMPLEMENT_EXTERNAL_TYPE_FACTORY(StructWithArray, StructWithArray);
+
+struct StructWithArrayAnnotation
+: public ManagedStructureAnnotation<StructWithArray,true,true> {
+    StructWithArrayAnnotation(ModuleLibrary & ml)
+    : ManagedStructureAnnotation ("StructWithArray", ml) {
+        addField<DAS_BIND_MANAGED_FIELD(some_ints)>("some_ints");
+    }
+    void init() {
+    }
+    virtual bool isLocal() const override { return true; }
+    virtual bool canCopy() const override { return true; }
+    virtual bool canMove() const override { return true; }
+    virtual bool canClone() const override { return true; }
+    virtual SimNode * simulateCopy ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {
+        return DasBinderCopy<StructWithArray>::make(context, at, l, r);
+    }
+    virtual SimNode * simulateClone ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {
+        return simulateCopy(context, at, l, r);
+    }
+};
+
+IMPLEMENT_EXTERNAL_TYPE_FACTORY(StructWithBitFields, StructWithBitFields);
+
+__forceinline unsigned int StructWithBitFields_get_field24(const StructWithBitFields &s) { return s.field24; }
+__forceinline void StructWithBitFields_set_field24(StructWithBitFields &s, unsigned int f) { s.field24 = f; }
+
+__forceinline unsigned int StructWithBitFields_get_field8(const StructWithBitFields &s) { return s.field8; }
+__forceinline void StructWithBitFields_set_field8(StructWithBitFields &s, unsigned int f) { s.field8 = f; }
+
+struct StructWithBitFieldsAnnotation
+: public ManagedStructureAnnotation<StructWithBitFields,true,true> {
+    StructWithBitFieldsAnnotation(ModuleLibrary & ml)
+    : ManagedStructureAnnotation ("StructWithBitFields", ml) {
+        bitfield_field24 = makeType<unsigned int>(ml);
+        bitfield_field8 = makeType<unsigned int>(ml);
+    }
+    void init() {
+    }
+    virtual bool isLocal() const override { return true; }
+    virtual bool canCopy() const override { return true; }
+    virtual bool canMove() const override { return true; }
+    virtual bool canClone() const override { return true; }
+    virtual SimNode * simulateCopy ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {
+        return DasBinderCopy<StructWithBitFields>::make(context, at, l, r);
+    }
+    virtual SimNode * simulateClone ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {
+        return simulateCopy(context, at, l, r);
+    }
+    TypeDeclPtr bitfield_field24;
+    TypeDeclPtr bitfield_field8;
+    virtual TypeDeclPtr makeFieldType ( const string & na, bool isConst ) const override {
+        if ( na == "field24" ) return make_smart<TypeDecl>(*bitfield_field24);
+        if ( na == "field8" ) return make_smart<TypeDecl>(*bitfield_field8);
+        return ManagedStructureAnnotation::makeFieldType(na, isConst);
+    }
+    virtual SimNode * simulateGetField ( const string & na, Context & context, const LineInfo & at, const ExpressionPtr & value ) const override {
+        if ( na == "field24" ) return context.code->makeNode<SimNode_DasBinderBitfieldGet<StructWithBitFields, unsigned int, &StructWithBitFields_get_field24>>(at, value->simulate(context));
+        if ( na == "field8" ) return context.code->makeNode<SimNode_DasBinderBitfieldGet<StructWithBitFields, unsigned int, &StructWithBitFields_get_field8>>(at, value->simulate(context));
+        return ManagedStructureAnnotation::simulateGetField(na, context, at, value);
+    }
+    virtual SimNode * simulateGetFieldR2V ( const string & na, Context & context, const LineInfo & at, const ExpressionPtr & value ) const override {
+        if ( na == "field24" ) return context.code->makeNode<SimNode_DasBinderBitfieldGet<StructWithBitFields, unsigned int, &StructWithBitFields_get_field24>>(at, value->simulate(context));
+        if ( na == "field8" ) return context.code->makeNode<SimNode_DasBinderBitfieldGet<StructWithBitFields, unsigned int, &StructWithBitFields_get_field8>>(at, value->simulate(context));
+        return ManagedStructureAnnotation::simulateGetFieldR2V(na, context, at, value);
+    }
+};
+
+IMPLEMENT_EXTERNAL_TYPE_FACTORY(StructWithChars, StructWithChars);
+
+__forceinline char * StructWithChars_get_some_chars(const StructWithChars &s, Context * context) { return dasBinderStringFromArray(context, s.some_chars, sizeof(s.some_chars)); }
+__forceinline void StructWithChars_set_some_chars(StructWithChars &s, const char * f) { dasBinderCopyString(s.some_chars, sizeof(s.some_chars), f); }
+
+struct StructWithCharsAnnotation
+: public ManagedStructureAnnotation<StructWithChars,true,true> {
+    StructWithCharsAnnotation(ModuleLibrary & ml)
+    : ManagedStructureAnnotation ("StructWithChars", ml) {
+        addField<DAS_BIND_MANAGED_FIELD(some_chars)>("some_chars");
+    }
+    void init() {
+    }
+    virtual bool isLocal() const override { return true; }
+    virtual bool canCopy() const override { return true; }
+    virtual bool canMove() const override { return true; }
+    virtual bool canClone() const override { return true; }
+    virtual SimNode * simulateCopy ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {
+        return DasBinderCopy<StructWithChars>::make(context, at, l, r);
+    }
+    virtual SimNode * simulateClone ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {
+        return simulateCopy(context, at, l, r);
+    }
+};
+
+IMPLEMENT_EXTERNAL_TYPE_FACTORY(StructWithSizeT, StructWithSizeT);
+
+struct StructWithSizeTAnnotation
+: public ManagedStructureAnnotation<StructWithSizeT,true,true> {
+    StructWithSizeTAnnotation(ModuleLibrary & ml)
+    : ManagedStructureAnnotation ("StructWithSizeT", ml) {
+        addField<DAS_BIND_MANAGED_FIELD(my_size)>("my_size");
+    }
+    void init() {
+    }
+    virtual bool isLocal() const override { return true; }
+    virtual bool canCopy() const override { return true; }
+    virtual bool canMove() const override { return true; }
+    virtual bool canClone() const override { return true; }
+    virtual SimNode * simulateCopy ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {
+        return DasBinderCopy<StructWithSizeT>::make(context, at, l, r);
+    }
+    virtual SimNode * simulateClone ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {
+        return simulateCopy(context, at, l, r);
+    }
+};
+
+IMPLEMENT_EXTERNAL_TYPE_FACTORY(StructWithOpaqueHandle, StructWithOpaqueHandle);
+
+struct StructWithOpaqueHandleAnnotation
+: public ManagedStructureAnnotation<StructWithOpaqueHandle,true,true> {
+    StructWithOpaqueHandleAnnotation(ModuleLibrary & ml)
+    : ManagedStructureAnnotation ("StructWithOpaqueHandle", ml) {
+        addField<DAS_BIND_MANAGED_FIELD(handle)>("handle");
+    }
+    void init() {
+    }
+    virtual bool isLocal() const override { return true; }
+    virtual bool canCopy() const override { return true; }
+    virtual bool canMove() const override { return true; }
+    virtual bool canClone() const override { return true; }
+    virtual SimNode * simulateCopy ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {
+        return DasBinderCopy<StructWithOpaqueHandle>::make(context, at, l, r);
+    }
+    virtual SimNode * simulateClone ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {
+        return simulateCopy(context, at, l, r);
+    }
+};
+
+void addVulkanGeneratedEnums_0(Module & module, ModuleLibrary & lib) {
+    module.addEnumeration(make_smart<EnumerationFirstEnum>());
+    module.addEnumeration(make_smart<EnumerationSecondEnum>());
+}
+
+void addVulkanGeneratedOpaqueStructs_0(Module & module, ModuleLibrary & lib) {
+    module.addAnnotation(make_smart<ManagedValueAnnotation<SomeOpaqueHandle>>("SomeOpaqueHandle", "SomeOpaqueHandle"));
+    addExtern<DAS_BIND_FUN(SomeOpaqueHandle_equ), SimNode_DasBinderFastCall>(module, lib, "==",
+        SideEffects::none, "SomeOpaqueHandle_equ");
+    addExtern<DAS_BIND_FUN(SomeOpaqueHandle_nequ), SimNode_DasBinderFastCall>(module, lib, "!=",
+        SideEffects::none, "SomeOpaqueHandle_nequ");
+    addExtern<DAS_BIND_FUN(SomeOpaqueHandle_is_null), SimNode_DasBinderFastCall>(module, lib, "is_null",
+        SideEffects::none, "SomeOpaqueHandle_is_null");
+}
+
+void addVulkanGeneratedStructs_0(Module & module, ModuleLibrary & lib) {
+    module.addAnnotation(make_smart<FirstStructAnnotation>(lib));
+    module.addAnnotation(make_smart<SecondStructAnnotation>(lib));
+    module.addAnnotation(make_smart<StructWithArrayAnnotation>(lib));
+    module.addAnnotation(make_smart<StructWithBitFieldsAnnotation>(lib));
+    
+    addExtern<DAS_BIND_FUN(StructWithBitFields_get_field24)>(module, lib, "StructWithBitFields_get_field24",
+        SideEffects::none, "StructWithBitFields_get_field24");
+    addExtern<DAS_BIND_FUN(StructWithBitFields_set_field24)>(module, lib, "StructWithBitFields_set_field24",
+        SideEffects::modifyArgument, "StructWithBitFields_set_field24");
+    
+    addExtern<DAS_BIND_FUN(StructWithBitFields_get_field8)>(module, lib, "StructWithBitFields_get_field8",
+        SideEffects::none, "StructWithBitFields_get_field8");
+    addExtern<DAS_BIND_FUN(StructWithBitFields_set_field8)>(module, lib, "StructWithBitFields_set_field8",
+        SideEffects::modifyArgument, "StructWithBitFields_set_field8");
+    module.addAnnotation(make_smart<StructWithCharsAnnotation>(lib));
+    
+    addExtern<DAS_BIND_FUN(StructWithChars_get_some_chars)>(module, lib, "StructWithChars_get_some_chars",
+        SideEffects::none, "StructWithChars_get_some_chars");
+    addExtern<DAS_BIND_FUN(StructWithChars_set_some_chars)>(module, lib, "StructWithChars_set_some_chars",
+        SideEffects::modifyArgument, "StructWithChars_set_some_chars");
+    module.addAnnotation(make_smart<StructWithSizeTAnnotation>(lib));
+    module.addAnnotation(make_smart<StructWithOpaqueHandleAnnotation>(lib));
+}
+
+void addVulkanGeneratedFunctions_0(Module & module, ModuleLibrary & lib) {
+}
+
+void addVulkanGeneratedConsts_0(Module & module, ModuleLibrary & lib) {
+}
@@ -0,0 +1,97 @@
+'''
+Generates bindings for the example header with the JSON frontend and with
+the libclang frontend and fails if generated files differ. Skipped (exit
+code 0) when clang or libclang python bindings are not available.
+'''
+import argparse
+import difflib
+import filecmp
+import os
+import shutil
+import subprocess
+import sys
+import tempfile
+from os import path
+
+
+EXAMPLE_DIR = path.dirname(path.abspath(__file__))
+MAIN_PY = path.join(EXAMPLE_DIR, '..', '..',
+    'python_modules', 'das_binder', 'main.py')
+FRONTENDS = ['json', 'libclang']
+
+
+def missing_prerequisite(clang_c_exe):
+    if shutil.which(clang_c_exe) is None:
+        return f'{clang_c_exe} not found'
+    try:
+        import clang.cindex
+        clang.cindex.Index.create()
+    except Exception as e:
+        return f'libclang is not available: {e}'
+
+def generate(args, frontend, out_dpath):
+    os.makedirs(out_dpath)
+    cmd = [sys.executable, '-B', MAIN_PY, '--skip_self_tests',
+        '--frontend', frontend,
+        '--c_header_from', args.header,
+        '--num_parts', str(args.num_parts),
+        '--module_cpp_prefix', path.join(out_dpath, 'generated'),
+        '--module_h_inc_to', path.join(out_dpath, 'generated.h.inc'),
+        '--module_h', args.header,
+        '--config', args.config,
+        '--clang_c_exe', args.clang_c_exe,
+        '--include_dirs', args.include_dirs,
+        '--log_level', 'warning',
+    ]
+    subprocess.run(cmd, check=True)
+
+def compare(dpaths):
+    '''Prints differences, returns True if generated files match.'''
+    names = sorted(set(os.listdir(dpaths[0])) | set(os.listdir(dpaths[1])))
+    _, mismatch, errors = filecmp.cmpfiles(*dpaths, names, shallow=False)
+    for name in errors:
+        print(f'Only one frontend generated {name}')
+    for name in mismatch:
+        lines = []
+        for dpath in dpaths:
+            with open(path.join(dpath, name), 'r') as f:
+                lines.append(f.readlines())
+        sys.stdout.writelines(difflib.unified_diff(*lines,
+            *[path.join(path.basename(dpath), name) for dpath in dpaths]))
+    return not mismatch and not errors
+
+def main(argv):
+    parser = argparse.ArgumentParser(description=__doc__,
+        formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument('--header',
+        default=path.join(EXAMPLE_DIR, 'header_to_bind.h'),
+        help='Header to bind. Default: %(default)s')
+    parser.add_argument('--config',
+        default=path.join(EXAMPLE_DIR, 'binding_config.py'),
+        help='Binding config. Default: %(default)s')
+    parser.add_argument('--clang_c_exe', default='clang',
+        help='Clang for the JSON frontend. Default: %(default)s')
+    parser.add_argument('--include_dirs', default='',
+        help='";" separated include directories. Default: none')
+    parser.add_argument('--num_parts', type=int, default=2,
+        help='Number of generated parts. Default: %(default)s')
+    args = parser.parse_args(argv)
+    args.header = path.abspath(args.header)
+    args.config = path.abspath(args.config)
+
+    reason = missing_prerequisite(args.clang_c_exe)
+    if reason is not None:
+        print(f'Skipped: {reason}.')
+        return 0
+    with tempfile.TemporaryDirectory() as work_dpath:
+        dpaths = [path.join(work_dpath, frontend) for frontend in FRONTENDS]
+        for frontend, dpath in zip(FRONTENDS, dpaths):
+            generate(args, frontend, dpath)
+        if not compare(dpaths):
+            print('FAILED: frontends generated different bindings.')
+            return 1
+    print('OK: frontends generated identical bindings.')
+    return 0
+
+if __name__ == '__main__':
+    sys.exit(main(sys.argv[1:]))
@@ -46,9 +46,7 @@ struct StructWithSizeT {
     size_t my_size;
 };
 
-/*
 typedef struct SomeOpaqueData_T * SomeOpaqueHandle;
 struct StructWithOpaqueHandle {
     SomeOpaqueHandle handle;
 };
-*/
@@ -1,12 +1,14 @@
 import logging
 import argparse
-import json
+import marshal
 import sys
 import re
+import os
 from os import path
 from das_shared.object_base import LoggingObject
-from das_shared.op_sys import full_path, run_exec, write_to_file
-from das_shared.diag import log_on_exception
+from das_shared.op_sys import (full_path, run_exec, write_to_file,
+    write_lines_to_file, make_dirs)
+from das_shared.diag import log_exception_context
 from das_keywords import DAS_KEYWORDS
 
 
@@ -17,14 +19,266 @@ class BinderError(Exception):
     pass
 
 
+# Shared by all generated modules, hence the include guard.
+DAS_BINDER_HELPERS_H = [
+    '#ifndef DAS_BINDER_HELPERS_H_INC',
+    '#define DAS_BINDER_HELPERS_H_INC',
+    '',
+    '#ifndef DAS_BINDER_FIXED_COPY_MAX_SIZE',
+    '#define DAS_BINDER_FIXED_COPY_MAX_SIZE 64',
+    '#endif',
+    '',
+    '// Copy of compile time known size, memcpy gets inlined.',
+    'template <int size>',
+    'struct SimNode_DasBinderCopyFixed : das::SimNode_CopyRefValue {',
+    '    SimNode_DasBinderCopyFixed(const das::LineInfo & at, das::SimNode * ll, das::SimNode * rr)',
+    '        : SimNode_CopyRefValue(at, ll, rr, size) {}',
+    '    virtual vec4f eval ( das::Context & context ) override {',
+    '        DAS_PROFILE_NODE',
+    '        char * pl = l->evalPtr(context);',
+    '        char * pr = r->evalPtr(context);',
+    '        memcpy(pl, pr, size);',
+    '        return v_zero();',
+    '    }',
+    '};',
+    '',
+    'template <typename TT, bool small = (sizeof(TT) <= DAS_BINDER_FIXED_COPY_MAX_SIZE)>',
+    'struct DasBinderCopy {',
+    '    static das::SimNode * make ( das::Context & context, const das::LineInfo & at, das::SimNode * l, das::SimNode * r ) {',
+    '        return context.code->makeNode<das::SimNode_CopyRefValue>(at, l, r, uint32_t(sizeof(TT)));',
+    '    }',
+    '};',
+    '',
+    'template <typename TT>',
+    'struct DasBinderCopy<TT, true> {',
+    '    static das::SimNode * make ( das::Context & context, const das::LineInfo & at, das::SimNode * l, das::SimNode * r ) {',
+    '        return context.code->makeNode<SimNode_DasBinderCopyFixed<int(sizeof(TT))>>(at, l, r);',
+    '    }',
+    '};',
+    '',
+    '// Reads bitfield through inlined getter, so that it can be exposed as',
+    '// a read only annotation field.',
+    'template <typename TT, typename FT, FT (*getter)(const TT &)>',
+    'struct SimNode_DasBinderBitfieldGet : das::SimNode {',
+    '    SimNode_DasBinderBitfieldGet(const das::LineInfo & at, das::SimNode * s)',
+    '        : SimNode(at), subexpr(s) {}',
+    '    virtual vec4f eval ( das::Context & context ) override {',
+    '        DAS_PROFILE_NODE',
+    '        return das::cast<FT>::from(getter(*(const TT *) subexpr->evalPtr(context)));',
+    '    }',
+    '    das::SimNode * subexpr;',
+    '};',
+    '',
+    '// Copies das string into char array field, always zero terminated.',
+    '// Empty das strings are null.',
+    'inline void dasBinderCopyString ( char * dst, size_t size, const char * src ) {',
+    '    size_t len = src ? strlen(src) : 0;',
+    '    if ( len >= size ) len = size - 1;',
+    '    memcpy(dst, src ? src : "", len);',
+    '    dst[len] = 0;',
+    '}',
+    '',
+    '// Copies char array field into das string. Stops at the first zero or',
+    '// at the end of the array, so fields filled up without terminator are',
+    '// never read past.',
+    'inline char * dasBinderStringFromArray ( das::Context * context, const char * src, size_t size ) {',
+    '    return context->stringHeap->allocateString(src, uint32_t(strnlen(src, size)));',
+    '}',
+    '',
+    '// Evaluates scalar arguments with evalInt/evalFloat/... directly',
+    '// instead of evaluating them to vec4f and casting.',
+    'template <typename FuncT, FuncT fn>',
+    'struct SimNode_DasBinderFastCall;',
+    '',
+    'template <typename R, typename ...Args, R (*fn)(Args...)>',
+    'struct SimNode_DasBinderFastCall<R (*)(Args...), fn> : das::SimNode_ExtFuncCall<R (*)(Args...), fn> {',
+    '    SimNode_DasBinderFastCall(const das::LineInfo & at, const char * fnName)',
+    '        : das::SimNode_ExtFuncCall<R (*)(Args...), fn>(at, fnName) {}',
+    '    template <size_t... I>',
+    '    __forceinline R call ( das::Context & context, std::index_sequence<I...> ) {',
+    '        return fn(das::EvalTT<Args>::eval(context, this->arguments[I])...);',
+    '    }',
+    '    virtual vec4f eval ( das::Context & context ) override {',
+    '        DAS_PROFILE_NODE',
+    '        return das::cast<R>::from(call(context, std::make_index_sequence<sizeof...(Args)>()));',
+    '    }',
+    '};',
+    '',
+    'template <typename ...Args, void (*fn)(Args...)>',
+    'struct SimNode_DasBinderFastCall<void (*)(Args...), fn> : das::SimNode_ExtFuncCall<void (*)(Args...), fn> {',
+    '    SimNode_DasBinderFastCall(const das::LineInfo & at, const char * fnName)',
+    '        : das::SimNode_ExtFuncCall<void (*)(Args...), fn>(at, fnName) {}',
+    '    template <size_t... I>',
+    '    __forceinline void call ( das::Context & context, std::index_sequence<I...> ) {',
+    '        fn(das::EvalTT<Args>::eval(context, this->arguments[I])...);',
+    '    }',
+    '    virtual vec4f eval ( das::Context & context ) override {',
+    '        DAS_PROFILE_NODE',
+    '        call(context, std::make_index_sequence<sizeof...(Args)>());',
+    '        return v_zero();',
+    '    }',
+    '};',
+    '',
+    '// Call counters and timers for functions bound with instrumentation.',
+    '// Compiled out unless DAS_BINDER_INSTRUMENT is defined. Time includes',
+    '// evaluation of arguments.',
+    '#ifdef DAS_BINDER_INSTRUMENT',
+    '#include <algorithm>',
+    '#include <atomic>',
+    '#include <chrono>',
+    '#include <mutex>',
+    '#include <vector>',
+    '#include <stdio.h>',
+    '',
+    'struct DasBinderCallStat {',
+    '    const char * name = nullptr;',
+    '    std::atomic<uint64_t> calls{0};',
+    '    std::atomic<uint64_t> nsec{0};',
+    '};',
+    '',
+    'inline std::mutex & dasBinderCallStatsMutex() {',
+    '    static std::mutex mutex;',
+    '    return mutex;',
+    '}',
+    '',
+    'inline std::vector<DasBinderCallStat *> & dasBinderCallStats() {',
+    '    static std::vector<DasBinderCallStat *> stats;',
+    '    return stats;',
+    '}',
+    '',
+    'template <typename FuncT, FuncT fn>',
+    'DasBinderCallStat & dasBinderCallStat ( const char * name ) {',
+    '    static DasBinderCallStat * stat = [name]() {',
+    '        auto result = new DasBinderCallStat();',
+    '        result->name = name;',
+    '        std::lock_guard<std::mutex> lock(dasBinderCallStatsMutex());',
+    '        dasBinderCallStats().push_back(result);',
+    '        return result;',
+    '    }();',
+    '    return *stat;',
+    '}',
+    '',
+    'template <template <typename FT, FT f> class SimNodeT>',
+    'struct DasBinderInstrumented {',
+    '    template <typename FuncT, FuncT fn>',
+    '    struct Node : SimNodeT<FuncT, fn> {',
+    '        Node(const das::LineInfo & at, const char * fnName)',
+    '            : SimNodeT<FuncT, fn>(at, fnName), stat(dasBinderCallStat<FuncT, fn>(fnName)) {}',
+    '        virtual vec4f eval ( das::Context & context ) override {',
+    '            auto start = std::chrono::steady_clock::now();',
+    '            vec4f result = SimNodeT<FuncT, fn>::eval(context);',
+    '            auto nsec = std::chrono::duration_cast<std::chrono::nanoseconds>(',
+    '                std::chrono::steady_clock::now() - start).count();',
+    '            stat.calls.fetch_add(1, std::memory_order_relaxed);',
+    '            stat.nsec.fetch_add(uint64_t(nsec), std::memory_order_relaxed);',
+    '            return result;',
+    '        }',
+    '        DasBinderCallStat & stat;',
+    '    };',
+    '};',
+    '',
+    'inline void dasBinderDumpCallStats() {',
+    '    std::vector<DasBinderCallStat *> stats;',
+    '    {',
+    '        std::lock_guard<std::mutex> lock(dasBinderCallStatsMutex());',
+    '        stats = dasBinderCallStats();',
+    '    }',
+    '    std::sort(stats.begin(), stats.end(), [](DasBinderCallStat * a, DasBinderCallStat * b) {',
+    '        return a->nsec.load() > b->nsec.load();',
+    '    });',
+    '    printf("%-48s %12s %14s %10s\\n", "function", "calls", "total us", "avg ns");',
+    '    for ( auto stat : stats ) {',
+    '        uint64_t calls = stat->calls.load();',
+    '        uint64_t nsec = stat->nsec.load();',
+    '        printf("%-48s %12llu %14.1f %10.1f\\n", stat->name, (unsigned long long) calls,',
+    '            nsec / 1000.0, calls ? double(nsec) / calls : 0.0);',
+    '    }',
+    '}',
+    '',
+    'inline void dasBinderResetCallStats() {',
+    '    std::lock_guard<std::mutex> lock(dasBinderCallStatsMutex());',
+    '    for ( auto stat : dasBinderCallStats() ) {',
+    '        stat->calls = 0;',
+    '        stat->nsec = 0;',
+    '    }',
+    '}',
+    '',
+    '#define DAS_BINDER_CALL_NODE(node) DasBinderInstrumented<node>::Node',
+    '#else',
+    '#define DAS_BINDER_CALL_NODE(node) node',
+    '#endif // DAS_BINDER_INSTRUMENT',
+    '',
+    '#endif // DAS_BINDER_HELPERS_H_INC',
+]
+
+C_SCALAR_TYPES = {
+    'void', '_Bool', 'bool', 'float', 'double',
+    'char', 'signed char', 'unsigned char',
+    'short', 'unsigned short', 'int', 'unsigned int',
+    'long', 'unsigned long', 'long long', 'unsigned long long',
+    'int8_t', 'uint8_t', 'int16_t', 'uint16_t',
+    'int32_t', 'uint32_t', 'int64_t', 'uint64_t',
+    'size_t', 'intptr_t', 'uintptr_t', 'ptrdiff_t',
+}
+
+
+class RaisingArgumentParser(argparse.ArgumentParser):
+    '''Raises BinderError instead of printing usage and exiting.'''
+
+    def error(self, message):
+        raise BinderError(message)
+
+
 class Settings(object):
 
-    def __init__(self, argv):
-        self.__args = self.__parse_argv(argv=argv)
+    # Options that take one value per variant, see --config.
+    VARIANT_OPTIONS = ['config', 'module_cpp_prefix', 'module_h_inc_to',
+        'depfile_to', 'diff_against', 'config_cache_to', 'manifest_to']
+
+    def __init__(self, argv, variant=0,
+        parser_class=argparse.ArgumentParser
+    ):
+        self.__argv = argv
+        self.__parser_class = parser_class
+        self.__args = self.__parse_argv(argv=argv, parser_class=parser_class)
+        self.__variant = variant
+
+    @property
+    def variants(self):
+        '''One Settings per config given in --config.'''
+        return [Settings(argv=self.__argv, variant=variant,
+                parser_class=self.__parser_class)
+            for variant in range(len(self.__args.config))]
+
+    def __variant_arg(self, name):
+        values = getattr(self.__args, name)
+        if values is not None:
+            return values[self.__variant]
 
     @classmethod
-    def __parse_argv(cls, argv):
-        parser = argparse.ArgumentParser(
+    def from_options(cls, **options):
+        '''Takes command line options as keyword arguments, e.g.
+        Settings.from_options(c_header_from='a.h', num_parts=2, ...).
+        include_dirs may be a list.'''
+        argv = []
+        for name, value in options.items():
+            if value is None or value is False:
+                continue
+            if name == 'include_dirs' and not isinstance(value, str):
+                value = options.get('include_dirs_sep', ';').join(value)
+            argv += [f'--{name}']
+            if isinstance(value, (list, tuple)):
+                argv += [str(v) for v in value]
+            elif value is not True:
+                argv += [str(value)]
+        try:
+            return cls(argv=argv, parser_class=RaisingArgumentParser)
+        except BinderError as e:
+            raise BinderError(f'Invalid binder options: {e}')
+
+    @classmethod
+    def __parse_argv(cls, argv, parser_class):
+        parser = parser_class(
             description='Generates das::Module binding stuff from .h file.')
         parser.add_argument('--c_header_from', type=str, required=True,
             help='.h file to generate bindings from.')
@@ -32,10 +286,12 @@ class Settings(object):
             help='Number of compilation units to split generated bindings '
                 'into.')
         parser.add_argument('--module_cpp_prefix', type=str, required=True,
+            nargs='+',
             help='Prefix for .cpp files to write generated das::Module '
-                'parts to.')
+                'parts to. One per config.')
         parser.add_argument('--module_h_inc_to', type=str, required=True,
-            help='.h file to write generated das header to.')
+            nargs='+',
+            help='.h file to write generated das header to. One per config.')
         parser.add_argument('--module_h', type=str, required=True,
             help='.h file to include in generated .cpp')
         parser.add_argument('--clang_c_exe', type=str, default='clang',
@@ -44,12 +300,51 @@ class Settings(object):
             help='Additional "include" directories to use.')
         parser.add_argument('--include_dirs_sep', type=str, default=';',
             help='Separator used in "--include_dirs".')
-        parser.add_argument('--config', type=str, required=True,
-            help='Path to binding config.')
+        parser.add_argument('--config', type=str, required=True, nargs='+',
+            help='Path to binding config. Several configs generate several '
+                'modules from a single parse of the header.')
+        parser.add_argument('--frontend', type=str,
+            choices=['json', 'libclang', 'auto'], default='json',
+            help='How to get AST: "json" runs clang and parses its JSON '
+                'dump, "libclang" walks clang.cindex cursors in-process, '
+                '"auto" uses libclang if it can be imported. '
+                'Default: %(default)s')
+        parser.add_argument('--depfile_to', type=str, nargs='+',
+            help='Makefile/Ninja depfile to write with every file the '
+                'bindings depend on: headers read by clang, the config and '
+                'its imports. One per config.')
+        parser.add_argument('--ast_from', type=str,
+            help='AST snapshot (or .ast.json) to use instead of running '
+                'clang.')
+        parser.add_argument('--ast_snapshot_to', type=str,
+            help='Where to write compact AST snapshot. Format is chosen by '
+                'extension: .json.gz, .json.xz, .pickle.gz or .pickle.xz.')
+        parser.add_argument('--manifest_to', type=str, nargs='+',
+            help='JSON manifest to write with every bound symbol, its part '
+                'and digest. One per config.')
+        parser.add_argument('--diff_against', type=str, nargs='+',
+            help='Manifest of a previous run, see --manifest_to. If given, '
+                'only reports added, removed and changed symbols, no '
+                'bindings are written. One per config.')
+        parser.add_argument('--config_cache_to', type=str, nargs='+',
+            help='File to cache compiled config in between runs. Not cached '
+                'by default. One per config.')
+        parser.add_argument('--skip_self_tests', action='store_true',
+            help='Do not run doctests before generating bindings. '
+                'Recommended for production builds.')
         parser.add_argument('--log_level', type=str,
             choices=['debug', 'info', 'warning', 'error'],
             default='info', help='Logging level. Default: %(default)s')
-        return parser.parse_args(argv)
+        args = parser.parse_args(argv)
+        for name in cls.VARIANT_OPTIONS:
+            values = getattr(args, name)
+            if values is not None and len(values) != len(args.config):
+                parser.error(f'--{name} needs one value per --config')
+        return args
+
+    @property
+    def frontend(self):
+        return self.__args.frontend
 
     @property
     def log_level(self):
@@ -57,7 +352,7 @@ class Settings(object):
 
     @property
     def module_cpp_prefix(self):
-        return full_path(self.__args.module_cpp_prefix)
+        return full_path(self.__variant_arg('module_cpp_prefix'))
 
     @property
     def num_parts(self):
@@ -65,7 +360,7 @@ class Settings(object):
 
     @property
     def module_h_inc_to(self):
-        return full_path(self.__args.module_h_inc_to)
+        return full_path(self.__variant_arg('module_h_inc_to'))
 
     @property
     def module_h(self):
@@ -81,26 +376,192 @@ class Settings(object):
 
     @property
     def include_dirs(self):
+        if self.__args.include_dirs is None:
+            return []
         return self.__args.include_dirs.split(self.__args.include_dirs_sep)
 
     @property
     def config_fpath(self):
-        return full_path(self.__args.config)
+        return full_path(self.__variant_arg('config'))
+
+    @property
+    def ast_from(self):
+        if self.__args.ast_from is not None:
+            return full_path(self.__args.ast_from)
+
+    @property
+    def ast_snapshot_to(self):
+        # All variants share the AST, first one writes it.
+        if self.__args.ast_snapshot_to is not None and self.__variant == 0:
+            return full_path(self.__args.ast_snapshot_to)
+
+    @property
+    def diff_against(self):
+        if self.__args.diff_against is not None:
+            return full_path(self.__variant_arg('diff_against'))
+
+    @property
+    def manifest_to(self):
+        if self.__args.manifest_to is not None:
+            return full_path(self.__variant_arg('manifest_to'))
+
+    @property
+    def config_cache_fpath(self):
+        if self.__args.config_cache_to is not None:
+            return full_path(self.__variant_arg('config_cache_to'))
+
+    @property
+    def depfile_to(self):
+        if self.__args.depfile_to is not None:
+            return full_path(self.__variant_arg('depfile_to'))
+
+
+class BinderCache(object):
+    '''
+    Lets several Binder runs in one process share parsed ASTs, compiled
+    configs and raw headers. An entry is rebuilt when any file it was
+    built from has changed.
+    '''
+
+    def __init__(self):
+        self.__entries = {}
+
+    def get(self, key, build):
+        '''build() must return value and paths of files it was built from.'''
+        entry = self.__entries.get(key)
+        if entry is not None:
+            value, mtimes = entry
+            if all(self.__mtime(fpath) == mtime
+                for fpath, mtime in mtimes.items()
+            ):
+                return value
+        value, fpaths = build()
+        self.__entries[key] = (value, {fpath: self.__mtime(fpath)
+            for fpath in fpaths})
+        return value
+
+    @staticmethod
+    def __mtime(fpath):
+        try:
+            return os.stat(fpath).st_mtime_ns
+        except OSError:
+            return None
+
+
+class BindResult(object):
+    '''manifest is None unless --manifest_to or --diff_against is given.'''
+
+    def __init__(self, outputs, stats, manifest, diff=None):
+        self.outputs = outputs
+        self.stats = stats
+        self.manifest = manifest
+        self.diff = diff
+
+
+def run_binders(settings, cache=None):
+    '''Runs Binder for every config in settings, parsing the header once.
+    Returns BindResult per config.'''
+    cache = cache or BinderCache()
+    return [Binder(settings=variant, cache=cache).run()
+        for variant in settings.variants]
+
+
+class ModuleShard(object):
+    '''Symbols that go to one generated das::Module.'''
+
+    def __init__(self, das_module_name, suffix):
+        self.das_module_name = das_module_name
+        self.suffix = suffix
+        self.enums = []
+        self.opaque_structs = []
+        self.structs = []
+        self.functions = []
+        self.macro_consts = []
+        self.dependencies = []
+        # Dependency to "type used by symbol" that made it one.
+        self.dependency_causes = {}
+        self.__parts = {}
+
+    KINDS = ['enums', 'opaque_structs', 'structs', 'functions',
+        'macro_consts']
+
+    @property
+    def types(self):
+        return self.enums + self.opaque_structs + self.structs
+
+    def parts(self, num_parts):
+        '''Symbols of each kind split to parts, computed once per
+        num_parts, so do not add symbols after the first call.'''
+        if num_parts not in self.__parts:
+            self.__parts[num_parts] = {kind: split_to_parts(
+                getattr(self, kind), num_parts) for kind in self.KINDS}
+        return self.__parts[num_parts]
 
 
 class Binder(LoggingObject):
+    '''
+    Either construct from command line arguments, or for in-process use:
+
+        cache = BinderCache()
+        result = Binder(settings=Settings.from_options(...),
+            cache=cache).run()
+
+    Binder uses the first config only, see run_binders() for several.
+    The binder does not configure logging itself.
+    '''
 
-    def __init__(self, argv):
-        self.__settings = Settings(argv=argv[1:])
-        self.__config = self.__read_config(self.__settings.config_fpath)
-        self.__main_c_header = C_TranslationUnit(
-            c_src_fpath=self.__settings.c_header_from,
-            clang_c_exe=self.__settings.clang_c_exe,
-            include_dirs=self.__settings.include_dirs,
-            config=self.__config)
-        self.__raw_c_headers = [C_HeaderRaw(fpath=fpath, config=self.__config)
+    def __init__(self, argv=None, settings=None, cache=None):
+        self.__settings = settings or Settings(argv=argv[1:])
+        self.__cache = cache or BinderCache()
+        self.__config_deps = []
+        self.__config = self.__read_config(self.__settings.config_fpath,
+            cache_fpath=self.__settings.config_cache_fpath)
+        name_filter = C_NameFilter(config=self.__config)
+        root, included_fpaths = self.__cache.get(
+            key=('ast', self.__settings.ast_from,
+                self.__settings.c_header_from, self.__settings.clang_c_exe,
+                tuple(self.__settings.include_dirs),
+                self.__settings.frontend),
+            build=self.__parse_ast)
+        self.__cached_shards = None
+        self.__main_c_header = C_TranslationUnit(root=root,
+            included_fpaths=included_fpaths, config=self.__config,
+            name_filter=name_filter)
+        self.__raw_c_headers = [C_HeaderRaw(fpath=fpath,
+            lines=self.__cache.get(key=('header', fpath),
+                build=lambda: (read_lines(fpath), [fpath])),
+            config=self.__config, name_filter=name_filter)
             for fpath in self.__raw_c_headers_fpaths]
 
+    def __parse_ast(self):
+        if self.__settings.ast_from is not None:
+            included_fpaths = [self.__settings.ast_from]
+            root = load_ast_snapshot(self.__settings.ast_from)
+        elif self.__use_libclang:
+            root, included_fpaths = C_TranslationUnit.parse_with_libclang(
+                c_src_fpath=self.__settings.c_header_from,
+                include_dirs=self.__settings.include_dirs)
+        else:
+            root, included_fpaths = C_TranslationUnit.parse(
+                c_src_fpath=self.__settings.c_header_from,
+                clang_c_exe=self.__settings.clang_c_exe,
+                include_dirs=self.__settings.include_dirs)
+        return (root, included_fpaths), included_fpaths
+
+    @property
+    def __use_libclang(self):
+        frontend = self.__settings.frontend
+        if frontend == 'json':
+            return False
+        if import_libclang() is not None:
+            return True
+        if frontend == 'libclang':
+            raise BinderError('Cannot import clang.cindex for libclang '
+                'frontend. Install libclang python bindings or use '
+                '"--frontend json".')
+        self._log_info('clang.cindex is not available, using JSON frontend.')
+        return False
+
     @property
     def __raw_c_headers_fpaths(self):
         for headers in [
@@ -146,136 +607,380 @@ class Binder(LoggingObject):
     def __ast(self):
         return self.__main_c_header.root
 
+    @property
+    def __symbol_index(self):
+        source_fpaths = {id(macro_const): header.fpath
+            for header in self.__raw_c_headers
+            for macro_const in header.macro_consts}
+        def source_fpath(node):
+            if isinstance(node, C_MacroConst):
+                return source_fpaths.get(id(node))
+            return self.__main_c_header.source_fpath(node)
+        return SymbolIndex(nodes=self.__enums + self.__opaque_structs
+            + self.__structs + self.__functions + list(self.__macro_consts),
+            source_fpath=source_fpath,
+            typedefs=self.__main_c_header.typedefs)
+
+    @property
+    def __shards(self):
+        '''Main module first, then config shards in dependency order.'''
+        if self.__cached_shards is None:
+            self.__cached_shards = self.__split_to_shards()
+        return self.__cached_shards
+
+    def __split_to_shards(self):
+        main = ModuleShard(self.__config.das_module_name, suffix='')
+        rules = self.__config.shards
+        shards = [main] + [ModuleShard(rule.das_module_name,
+            suffix=f'_{rule.das_module_name}') for rule in rules]
+        def shard_of(node, fpath):
+            for rule, shard in zip(rules, shards[1:]):
+                if rule.matches(node, fpath):
+                    return shard
+            return main
+        source_fpath = self.__main_c_header.source_fpath
+        for kind in ['enums', 'opaque_structs', 'structs', 'functions']:
+            for node in getattr(self.__main_c_header, kind):
+                fpath = source_fpath(node) if rules else None
+                getattr(shard_of(node, fpath), kind).append(node)
+        for header in self.__raw_c_headers:
+            for macro_const in header.macro_consts:
+                shard_of(macro_const, header.fpath).macro_consts.append(
+                    macro_const)
+        if not rules:
+            return shards
+        type_shards = {}
+        for shard in shards:
+            for node in shard.types:
+                type_shards[node.name] = shard
+                if isinstance(node, C_OpaqueStruct):
+                    type_shards[node.das_type] = shard
+        typedefs = self.__main_c_header.typedefs
+        def referenced_names(t, seen):
+            for name in re.findall(r'\w+', t):
+                if name in seen:
+                    continue
+                seen.add(name)
+                yield name
+                if name in typedefs:
+                    yield from referenced_names(typedefs[name], seen)
+        for shard in shards:
+            users = [(f'{struct.name}.{field.name}', field.type)
+                for struct in shard.structs for field in struct.fields]
+            users += [(function.name, function.type)
+                for function in shard.functions]
+            for user, t in users:
+                for name in referenced_names(t, set()):
+                    dep = type_shards.get(name, shard)
+                    if dep is not shard:
+                        shard.dependency_causes.setdefault(dep,
+                            f'{name} used by {user}')
+            shard.dependencies = [dep for dep in shards
+                if dep in shard.dependency_causes]
+        if main.dependency_causes:
+            raise BinderError(main_dependency_message(main))
+        return [main] + self.__sort_shards(shards[1:])
+
+    @staticmethod
+    def __sort_shards(shards):
+        result = []
+        visiting = []
+        def visit(shard):
+            if shard in result:
+                return
+            if shard in visiting:
+                raise BinderError(shard_cycle_message(
+                    visiting[visiting.index(shard):] + [shard]))
+            visiting.append(shard)
+            for dep in shard.dependencies:
+                visit(dep)
+            visiting.pop()
+            result.append(shard)
+        for shard in shards:
+            visit(shard)
+        return [shard for shard in result if shard.suffix]
+
     @property
     def __generated_cpp_inc_path(self):
         return f'{self.__settings.module_cpp_prefix}.cpp.inc'
 
     def run(self):
-        logging.basicConfig(level=self.__settings.log_level,
-            format='%(asctime)s [%(levelname)s:%(name)s] %(message)s')
-        self._log_info(f'Generating bindings for '
-            f'{self.__settings.c_header_from}')
-        self.__maybe_save_ast()
+        self._log_info('Generating bindings for %s with %s',
+            self.__settings.c_header_from, self.__settings.config_fpath)
+        outputs = []
+        outputs += self.__maybe_save_ast()
+        outputs += self.__maybe_save_ast_snapshot()
+        manifest = None
+        if (self.__settings.manifest_to is not None
+            or self.__settings.diff_against is not None
+        ):
+            manifest = self.__manifest
+        if self.__settings.diff_against is not None:
+            diff = self.__report_diff(self.__settings.diff_against,
+                manifest=manifest)
+            return BindResult(outputs=outputs, stats=self.__stats,
+                manifest=manifest, diff=diff)
         self._log_info('Running custom pass.')
         self.__config.custom_pass(CustomPassContext(
             main_c_header = self.__main_c_header,
-            macro_consts = self.__macro_consts,
+            macro_consts = list(self.__macro_consts),
+            index = self.__symbol_index,
         ))
-        write_to_file(fpath=self.__generated_cpp_inc_path,
-            content='\n'.join(self.__generate_module_cpp_inc() + ['']))
-        self._log_info(f'Wrote generated das::Module to '
-            f'{self.__generated_cpp_inc_path}')
+        write_lines_to_file(fpath=self.__generated_cpp_inc_path,
+            lines=self.__generate_module_cpp_inc())
+        outputs.append(self.__generated_cpp_inc_path)
+        self._log_info('Wrote generated das::Module to %s',
+            self.__generated_cpp_inc_path)
         for part in range(self.__settings.num_parts):
             fpath = f'{self.__settings.module_cpp_prefix}_{part}.cpp'
-            write_to_file(fpath=fpath,
-                content='\n'.join(self.__generate_module_cpp(part)+['']))
-            self._log_info(f'Wrote generated part to {fpath}')
-        write_to_file(fpath=self.__settings.module_h_inc_to,
-            content='\n'.join(self.__generate_module_h_inc() + ['']))
-        self._log_info(f'Wrote generated header to '
-            f'{self.__settings.module_h_inc_to}')
+            write_lines_to_file(fpath=fpath,
+                lines=self.__generate_module_cpp(part))
+            outputs.append(fpath)
+            self._log_info('Wrote generated part to %s', fpath)
+        write_lines_to_file(fpath=self.__settings.module_h_inc_to,
+            lines=self.__generate_module_h_inc())
+        outputs.append(self.__settings.module_h_inc_to)
+        self._log_info('Wrote generated header to %s',
+            self.__settings.module_h_inc_to)
+        outputs += self.__maybe_write_manifest(manifest)
+        outputs += self.__maybe_write_depfile()
         self._log_info('Finished successfully.')
+        return BindResult(outputs=outputs, stats=self.__stats,
+            manifest=manifest)
+
+    @property
+    def __stats(self):
+        return {
+            'enums': len(self.__enums),
+            'opaque_structs': len(self.__opaque_structs),
+            'structs': len(self.__structs),
+            'functions': len(self.__functions),
+            'macro_consts': len(list(self.__macro_consts)),
+            'collapsed_redecls': self.__main_c_header.num_collapsed_redecls,
+        }
+
+    @property
+    def __manifest(self):
+        import hashlib
+        symbols = {}
+        def add(kind, name, part, signature, shard):
+            symbol = {'part': part,
+                'digest': hashlib.blake2b(repr(signature).encode(),
+                    digest_size=8).hexdigest()}
+            if shard.suffix:
+                symbol['module'] = shard.das_module_name
+            symbols[f'{kind}:{name}'] = symbol
+        for shard in self.__shards:
+            shard_parts = shard.parts(self.__settings.num_parts)
+            for kind in ModuleShard.KINDS:
+                for part, part_nodes in enumerate(shard_parts[kind]):
+                    for node in part_nodes:
+                        add(node.KIND, node.name, part, node.signature, shard)
+                        if isinstance(node, C_Struct):
+                            for field in node.fields:
+                                add(field.KIND, f'{node.name}.{field.name}',
+                                    part, field.signature, shard)
+        return {
+            'module': self.__config.das_module_name,
+            'num_parts': self.__settings.num_parts,
+            'symbols': symbols,
+        }
+
+    def __maybe_write_manifest(self, manifest):
+        import json
+        fpath = self.__settings.manifest_to
+        if fpath is None:
+            return []
+        write_to_file(fpath=fpath, content=json.dumps(manifest,
+            separators=(',', ':'), sort_keys=True))
+        self._log_info('Wrote manifest to %s', fpath)
+        return [fpath]
+
+    def __report_diff(self, old_manifest_fpath, manifest):
+        import json
+        try:
+            with open(old_manifest_fpath, 'r') as f:
+                old_manifest = json.load(f)
+        except (IOError, ValueError):
+            raise BinderError(f'Could not read manifest: {old_manifest_fpath}')
+        return list(diff_manifests(old=old_manifest, new=manifest))
+
+    def __maybe_write_depfile(self):
+        fpath = self.__settings.depfile_to
+        if fpath is None:
+            return []
+        deps = []
+        for dep in (self.__main_c_header.included_fpaths + self.__config_deps
+            + [header.fpath for header in self.__raw_c_headers]
+        ):
+            if dep not in deps:
+                deps.append(dep)
+        write_to_file(fpath=fpath, content=format_make_deps(
+            target=self.__settings.module_h_inc_to, deps=deps))
+        self._log_info('Wrote depfile to %s', fpath)
+        return [fpath]
 
     def __maybe_save_ast(self):
         if not self.__config.save_ast:
-            return
+            return []
+        import json
         ast_fpath = self.__settings.module_cpp_prefix + '.ast.json'
         write_to_file(fpath=ast_fpath, content=json.dumps(self.__ast,
             indent=4, sort_keys=True))
-        self._log_info(f'Wrote AST for C header to {ast_fpath}')
-
-    def __read_config(self, config_fpath):
-        try:
-            with open(config_fpath, 'r') as f:
-                cfg_py = f.read()
-        except IOError:
-            raise BinderError(f'Could not read config file: {config_fpath}')
+        self._log_info('Wrote AST for C header to %s', ast_fpath)
+        return [ast_fpath]
+
+    def __maybe_save_ast_snapshot(self):
+        fpath = self.__settings.ast_snapshot_to
+        if fpath is None:
+            return []
+        save_ast_snapshot(root=self.__ast, fpath=fpath)
+        self._log_info('Wrote AST snapshot to %s', fpath)
+        return [fpath]
+
+    def __read_config(self, config_fpath, cache_fpath):
+        cfg_code = self.__cache.get(key=('config', config_fpath),
+            build=lambda: (self.__compile_config(config_fpath, cache_fpath),
+                [config_fpath]))
+        config_dpath = path.dirname(config_fpath)
         old_path = list(sys.path)
-        sys.path.insert(0, path.dirname(config_fpath))
+        old_modules = set(sys.modules)
+        sys.path.insert(0, config_dpath)
         cfg_globals = {}
-        exec(cfg_py, cfg_globals)
-        sys.path = old_path
+        try:
+            exec(cfg_code, cfg_globals)
+        finally:
+            sys.path = old_path
+        new_modules = {name: full_path(sys.modules[name].__file__)
+            for name in set(sys.modules) - old_modules
+            if getattr(sys.modules[name], '__file__', None) is not None}
+        self.__config_deps = [config_fpath] + sorted(new_modules.values())
+        # Modules next to the config must be re-imported by the next config
+        # run in this process, which might have a same named module.
+        for name, module_fpath in new_modules.items():
+            if path.dirname(module_fpath) == config_dpath:
+                del sys.modules[name]
         config_class = cfg_globals.get('Config')
         if config_class is None:
             raise BinderError(f'Config file must define "Config" class.')
         return config_class()
 
+    @staticmethod
+    def __generate_section_title(title):
+        yield ''
+        yield '//'
+        yield f'// {title}'
+        yield '//'
+        yield ''
+
+    @staticmethod
+    def __generate_add_function(name, items):
+        yield ''
+        yield f'void {name}(Module & module, ModuleLibrary & lib) {{'
+        for item in items:
+            for line in item.generate_add():
+                yield f'    {line}'
+        yield '}'
+
+    def __compile_config(self, config_fpath, cache_fpath):
+        try:
+            stat = os.stat(config_fpath)
+        except OSError:
+            raise BinderError(f'Could not read config file: {config_fpath}')
+        cache_key = (sys.implementation.cache_tag, config_fpath,
+            stat.st_mtime_ns, stat.st_size)
+        if cache_fpath is not None:
+            try:
+                with open(cache_fpath, 'rb') as f:
+                    cached_key, cfg_code = marshal.load(f)
+                if cached_key == cache_key:
+                    return cfg_code
+            except (OSError, EOFError, ValueError, TypeError):
+                pass
+        try:
+            with open(config_fpath, 'r') as f:
+                cfg_py = f.read()
+        except IOError:
+            raise BinderError(f'Could not read config file: {config_fpath}')
+        cfg_code = compile(cfg_py, config_fpath, 'exec')
+        if cache_fpath is None:
+            return cfg_code
+        try:
+            make_dirs(path.dirname(cache_fpath))
+            with open(cache_fpath, 'wb') as f:
+                marshal.dump((cache_key, cfg_code), f)
+        except OSError:
+            self._log_debug('Could not cache compiled config to %s',
+                cache_fpath)
+        return cfg_code
+
     def __generate_module_h_inc(self):
-        lines = []
-        module = self.__config.das_module_name
-        header_from = path.relpath(
-            self.__settings.c_header_from,
-            path.dirname(self.__settings.module_h_inc_to))
-        lines += [self.__config.title or f'// generated by {APP_NAME}']
-        lines += [
-            '',
-            '//',
-            '// enums',
-            '//',
-            ''] + [
-            line for enum in self.__enums
-                for line in enum.generate_decl_h()
-        ]
-        lines += [
-            '',
-            '//',
-            '// opaque structs',
-            '//',
-            ''] + [
-            line for struct in self.__opaque_structs
-                for line in struct.generate_decl_h()
-        ]
-        lines += [
-            '',
-            '//',
-            '// structs',
-            '//',
-            ''] + [
-            line for struct in self.__structs
-                for line in struct.generate_decl_h()
-        ]
-        return lines
+        yield self.__config.title or f'// generated by {APP_NAME}'
+        yield from self.__generate_section_title('helpers')
+        yield from DAS_BINDER_HELPERS_H
+        yield from self.__generate_section_title('enums')
+        for enum in self.__enums:
+            yield from enum.generate_decl_h()
+        yield from self.__generate_section_title('opaque structs')
+        for struct in self.__opaque_structs:
+            yield from struct.generate_decl_h()
+        yield from self.__generate_section_title('structs')
+        for struct in self.__structs:
+            yield from struct.generate_decl_h()
 
     def __generate_module_cpp_inc(self):
-        lines = []
-        module = self.__config.das_module_name
-        lines += [self.__config.title or f'// generated by {APP_NAME}']
-        lines += [
-            '',
-        ]
+        num_parts = self.__settings.num_parts
+        yield self.__config.title or f'// generated by {APP_NAME}'
+        yield ''
         kinds = ['Enums', 'OpaqueStructs', 'Structs', 'Functions', 'Consts']
-        for part in range(self.__settings.num_parts):
+        for shard in self.__shards:
+            for part in range(num_parts):
+                for kind in kinds:
+                    yield (f'void addVulkanGenerated{kind}{shard.suffix}_{part}'
+                        '(Module &, ModuleLibrary &);')
+        for shard in self.__shards:
+            module = shard.das_module_name
+            yield from [
+                '',
+               f'class GeneratedModule_{module} : public Module {{',
+                'public:',
+               f'    GeneratedModule_{module}() : Module("{module}") {{',
+                '    }',
+                '',
+                'protected:',
+                '    void addGenerated(ModuleLibrary & lib) {',
+            ]
+            for dep in shard.dependencies:
+                yield (f'        addBuiltinDependency(lib, '
+                    f'Module::require("{dep.das_module_name}"));')
             for kind in kinds:
-                lines += [f'void addVulkanGenerated{kind}_{part}'
-                    '(Module &, ModuleLibrary &);'
+                for part in range(num_parts):
+                    yield (f'        addVulkanGenerated{kind}{shard.suffix}_'
+                        f'{part}(*this, lib);')
+            if not shard.suffix and any(function.is_instrumented
+                for function in self.__functions
+            ):
+                yield from [
+                    '#ifdef DAS_BINDER_INSTRUMENT',
+                    '        addExtern<DAS_BIND_FUN(dasBinderDumpCallStats)>(*this, lib,',
+                    '            "das_binder_dump_call_stats", SideEffects::modifyExternal,',
+                    '            "dasBinderDumpCallStats");',
+                    '        addExtern<DAS_BIND_FUN(dasBinderResetCallStats)>(*this, lib,',
+                    '            "das_binder_reset_call_stats", SideEffects::modifyExternal,',
+                    '            "dasBinderResetCallStats");',
+                    '#endif',
                 ]
-        lines += [
-            '',
-           f'class GeneratedModule_{module} : public Module {{',
-            'public:',
-           f'    GeneratedModule_{module}() : Module("{module}") {{',
-            '    }',
-            '',
-            'protected:',
-            '    void addGenerated(ModuleLibrary & lib) {'] + [
-           f'        addVulkanGenerated{kind}_{part}(*this, lib);'
-                     for kind in kinds
-                     for part in range(self.__settings.num_parts)] + [
-            '    }',
-            '};',
-        ]
-        return lines
+            yield '    }'
+            yield '};'
 
     def __generate_module_cpp(self, part_i):
-        lines = []
-        module = self.__config.das_module_name
         header = path.relpath(
             self.__settings.module_h,
             path.dirname(self.__settings.module_cpp_prefix))
-        part_of = lambda xs: split_to_parts(
-            list(xs), self.__settings.num_parts)[part_i]
-        lines += [self.__config.title or f'// generated by {APP_NAME}']
-        lines += [
+        num_parts = self.__settings.num_parts
+        part_of = lambda shard, kind: shard.parts(num_parts)[kind][part_i]
+        yield self.__config.title or f'// generated by {APP_NAME}'
+        yield from [
            f'#include "{header}"',
             '',
             'using namespace das;',
@@ -293,77 +998,191 @@ class Binder(LoggingObject):
             '#pragma clang diagnostic ignored "-Wunused-parameter"',
             '#endif',
         ]
-        lines += [
-            '',
-            '//',
-            '// opaque structs',
-            '//',
-            ''] + [
-            line for struct in part_of(self.__opaque_structs)
-                for line in struct.generate_decl_cpp()
-        ]
-        lines += [
-            '',
-            '//',
-            '// structs',
-            '//',
-            ''] + [
-            line for struct in part_of(self.__structs)
-                for line in struct.generate_decl_cpp()
-        ]
-        lines += [
-            '',
-           f'void addVulkanGeneratedEnums_{part_i}('
-                'Module & module, ModuleLibrary & lib) {'] + [
-           f'    {line}' for enum in part_of(self.__enums)
-                 for line in enum.generate_add()] + [
-            '}',
-        ]
-        lines += [
-            '',
-           f'void addVulkanGeneratedOpaqueStructs_{part_i}('
-                'Module & module, ModuleLibrary & lib) {'] + [
-           f'    {line}' for struct in part_of(self.__opaque_structs)
-                 for line in struct.generate_add()] + [
-            '}',
-        ]
-        lines += [
-            '',
-           f'void addVulkanGeneratedStructs_{part_i}('
-                'Module & module, ModuleLibrary & lib) {'] + [
-           f'    {line}' for struct in part_of(self.__structs)
-                 for line in struct.generate_add()] + [
-            '}',
-        ]
-        lines += [
-            '',
-           f'void addVulkanGeneratedFunctions_{part_i}('
-                'Module & module, ModuleLibrary & lib) {'] + [
-           f'    {line}' for function in part_of(self.__functions)
-                 for line in function.generate_add()] + [
-            '}',
-        ]
-        lines += [
-            '',
-           f'void addVulkanGeneratedConsts_{part_i}('
-                'Module & module, ModuleLibrary & lib) {'] + [
-           f'    {line}' for const in part_of(self.__macro_consts)
-                 for line in const.generate_add()] + [
-            '}',
-        ]
-        return lines
+        yield from self.__generate_section_title('opaque structs')
+        for shard in self.__shards:
+            for struct in part_of(shard, 'opaque_structs'):
+                yield from struct.generate_decl_cpp()
+        yield from self.__generate_section_title('structs')
+        for shard in self.__shards:
+            for struct in part_of(shard, 'structs'):
+                yield from struct.generate_decl_cpp()
+        for shard in self.__shards:
+            suffix = f'{shard.suffix}_{part_i}'
+            yield from self.__generate_add_function(
+                f'addVulkanGeneratedEnums{suffix}', part_of(shard, 'enums'))
+            yield from self.__generate_add_function(
+                f'addVulkanGeneratedOpaqueStructs{suffix}',
+                part_of(shard, 'opaque_structs'))
+            yield from self.__generate_add_function(
+                f'addVulkanGeneratedStructs{suffix}',
+                part_of(shard, 'structs'))
+            yield from self.__generate_add_function(
+                f'addVulkanGeneratedFunctions{suffix}',
+                part_of(shard, 'functions'))
+            yield from self.__generate_add_function(
+                f'addVulkanGeneratedConsts{suffix}',
+                part_of(shard, 'macro_consts'))
 
 
 class CustomPassContext(object):
 
-    def __init__(self, main_c_header, macro_consts):
+    def __init__(self, main_c_header, macro_consts, index):
         self.main_c_header = main_c_header
         self.macro_consts = macro_consts
+        self.index = index
+
+
+class SymbolIndex(object):
+    '''
+    Read-only lookups over bound nodes for custom passes. Name, kind and
+    prefix lookups are built upfront, file and type reference lookups on
+    first use. Every lookup returns nodes in generation order.
+    '''
+
+    def __init__(self, nodes, source_fpath, typedefs):
+        self.__nodes = tuple(nodes)
+        self.__source_fpath = source_fpath
+        self.__typedefs = typedefs
+        self.__by_name = {}
+        self.__by_kind = {}
+        self.__positions = {}
+        for i, node in enumerate(self.__nodes):
+            self.__positions[id(node)] = i
+            self.__by_name.setdefault(node.name, []).append(node)
+            self.__by_kind.setdefault(node.KIND, []).append(node)
+        self.__sorted_names = sorted(self.__by_name)
+        self.__by_file = None
+        self.__by_type = None
+
+    def get(self, name, kind=None):
+        '''Node with given name, or None.'''
+        for node in self.__by_name.get(name, []):
+            if kind is None or node.KIND == kind:
+                return node
+
+    def of_kind(self, kind):
+        return tuple(self.__by_kind.get(kind, []))
+
+    def with_prefix(self, prefix, kind=None):
+        import bisect
+        begin = bisect.bisect_left(self.__sorted_names, prefix)
+        names = []
+        for name in self.__sorted_names[begin:]:
+            if not name.startswith(prefix):
+                break
+            names.append(name)
+        return self.__in_order(node for name in names
+            for node in self.__by_name[name]
+            if kind is None or node.KIND == kind)
+
+    def in_file(self, fpath):
+        '''Nodes declared in given file, compared by full path.'''
+        if self.__by_file is None:
+            self.__by_file = {}
+            for node in self.__nodes:
+                node_fpath = self.__source_fpath(node)
+                if node_fpath is not None:
+                    self.__by_file.setdefault(full_path(node_fpath),
+                        []).append(node)
+        return tuple(self.__by_file.get(full_path(fpath), []))
+
+    def referencing(self, type_name):
+        '''Structs with a field of, and functions with a parameter or
+        return value of given type, also through typedefs.'''
+        if self.__by_type is None:
+            self.__by_type = {}
+            for node in self.__nodes:
+                if isinstance(node, C_Struct):
+                    types = [field.type for field in node.fields]
+                elif isinstance(node, C_Function):
+                    types = [node.type]
+                else:
+                    continue
+                for name in self.__referenced_names(types):
+                    self.__by_type.setdefault(name, []).append(node)
+        return tuple(self.__by_type.get(type_name, []))
+
+    def __referenced_names(self, types):
+        names = set()
+        pending = list(types)
+        while pending:
+            for name in re.findall(r'\w+', pending.pop()):
+                if name not in names:
+                    names.add(name)
+                    if name in self.__typedefs:
+                        pending.append(self.__typedefs[name])
+        return names
+
+    def __in_order(self, nodes):
+        return tuple(sorted(nodes, key=lambda node: self.__positions[id(node)]))
+
+
+class NameMatcher(object):
+    '''
+    Compiles NameRules into a set of exact names plus one combined regex.
+
+    >>> from das_binder.config import NameRules
+    >>> m = NameMatcher([NameRules(names=['Foo'], prefixes=['vk'],
+    ...     globs=['*KHR'], regexes=[r'Bar[0-9]+'])])
+    >>> [m.matches(n) for n in ['Foo', 'vkFoo', 'FooKHR', 'Bar12', 'Bar']]
+    [True, True, True, True, False]
+    >>> NameMatcher([]).matches('Foo')
+    False
+    '''
+
+    def __init__(self, rules):
+        import fnmatch
+        self.__names = set()
+        patterns = []
+        for rule in rules:
+            self.__names |= rule.names
+            patterns += [re.escape(prefix) + '.*' for prefix in rule.prefixes]
+            patterns += [fnmatch.translate(glob) for glob in rule.globs]
+            patterns += list(rule.regexes)
+        self.__regex = re.compile('|'.join(
+            f'(?:{pattern})' for pattern in patterns)) if patterns else None
+
+    def matches(self, name):
+        return name in self.__names or (self.__regex is not None
+            and self.__regex.fullmatch(name) is not None)
+
+
+class C_NameFilter(object):
+
+    def __init__(self, config):
+        self.__includes = {kind: NameMatcher([rules])
+            for kind, rules in config.include_rules.items()}
+        self.__excludes = {kind: NameMatcher([rules])
+            for kind, rules in config.exclude_rules.items()}
+
+    def accepts(self, kind, name):
+        include = self.__includes.get(kind)
+        if include is not None and not include.matches(name):
+            return False
+        exclude = self.__excludes.get(kind)
+        return exclude is None or not exclude.matches(name)
 
 
 class C_TranslationUnit(LoggingObject):
 
-    def __init__(self, c_src_fpath, clang_c_exe, include_dirs, config):
+    def __init__(self, root, included_fpaths, config, name_filter):
+        self.__root = root
+        self.__included_fpaths = included_fpaths
+        self.__config = config
+        self.__name_filter = name_filter
+        self.__cached_classified = None
+        self.__cached_enums = None
+        self.__cached_structs = None
+        self.__cached_opaque_structs = None
+        self.__cached_functions = None
+        self.__cached_decls = None
+        self.__num_collapsed_redecls = 0
+        self.__cached_decl_fpaths = None
+        self.__cached_typedefs = None
+
+    @staticmethod
+    def parse(c_src_fpath, clang_c_exe, include_dirs):
+        '''Runs clang, returns AST and every file clang read.'''
         cmd = []
         cmd += [clang_c_exe, '-c',
             '-fno-delayed-template-parsing',
@@ -379,41 +1198,114 @@ class C_TranslationUnit(LoggingObject):
         ]
 
         cmd += [c_src_fpath]
-        out, err, exit_code = run_exec(cmd)
-        self.__root = json.loads(out)
-        self.__config = config
-        self.__cached_enums = None
-        self.__cached_structs = None
-        self.__cached_opaque_structs = None
-        self.__cached_functions = None
+        import json
+        import tempfile
+        with tempfile.TemporaryDirectory() as tmp_dpath:
+            deps_fpath = path.join(tmp_dpath, 'deps.d')
+            out, err, exit_code = run_exec(cmd + ['-MD', '-MF', deps_fpath])
+            with open(deps_fpath, 'r') as f:
+                included_fpaths = [full_path(fpath)
+                    for fpath in parse_make_deps(f.read())]
+        return json.loads(out), included_fpaths
 
-    def __get_nodes(self, node_class, configure_fn):
-        for inner in self.__root['inner']:
-            with log_on_exception(inner=inner):
-                node = node_class.maybe_create(
-                    root=inner, config=self.__config)
-                if node is None or node.is_builtin:
-                    continue
-                configure_fn(node)
-                if not node.is_ignored:
-                    yield node
+    @staticmethod
+    def parse_with_libclang(c_src_fpath, include_dirs):
+        '''Same as parse(), but walks libclang cursors in-process instead
+        of serializing AST to JSON and back.'''
+        cindex = import_libclang()
+        args = [f'-I{dpath.strip()}' for dpath in include_dirs
+            if dpath.strip()]
+        tu = cindex.Index.create().parse(c_src_fpath, args=args,
+            options=cindex.TranslationUnit.PARSE_SKIP_FUNCTION_BODIES)
+        errors = [str(diag) for diag in tu.diagnostics
+            if diag.severity >= cindex.Diagnostic.Error]
+        if errors:
+            raise BinderError(f'Failed to parse {c_src_fpath}:\n' +
+                '\n'.join(errors))
+        root = {'kind': 'TranslationUnitDecl', 'inner': [
+            node for node in (cursor_to_ast_node(cursor, cindex)
+                for cursor in tu.cursor.get_children())
+            if node is not None]}
+        duplicates = find_duplicate_ids(root['inner'])
+        if duplicates:
+            raise BinderError('libclang frontend gave the same id to '
+                'different decls: ' + ', '.join(duplicates))
+        included_fpaths = [full_path(c_src_fpath)] + [
+            full_path(inclusion.include.name)
+            for inclusion in tu.get_includes()]
+        return root, sorted(set(included_fpaths),
+            key=included_fpaths.index)
+
+    def __get_nodes(self, node_class, configure_fn, prepare_fn=None):
+        decls = self.__decls
+        nodes = [node_class.create(root=decls[i], config=self.__config)
+            for i in self.__classified.get(node_class.KIND, [])]
+        if prepare_fn is not None:
+            prepare_fn(nodes)
+        configure_fn(nodes)
+        return [node for node in nodes if not node.is_ignored]
+
+    @property
+    def __classified(self):
+        '''Maps node kind to indices of decls to create nodes from.'''
+        if self.__cached_classified is None:
+            self.__cached_classified = classify_decls(decls=self.__decls,
+                node_classes=[C_Enum, C_Struct, C_OpaqueStruct, C_Function],
+                name_filter=self.__name_filter)
+        return self.__cached_classified
+
+    @property
+    def __decls(self):
+        if self.__cached_decls is None:
+            self.__cached_decls, self.__num_collapsed_redecls = dedupe_decls(
+                self.__root['inner'])
+            self._log_info('Collapsed %d redeclarations.',
+                self.__num_collapsed_redecls)
+        return self.__cached_decls
+
+    @property
+    def typedefs(self):
+        '''Maps typedef name to the type it names.'''
+        if self.__cached_typedefs is None:
+            self.__cached_typedefs = {decl['name']: decl['type']['qualType']
+                for decl in self.__decls
+                if decl['kind'] == 'TypedefDecl' and 'type' in decl}
+        return self.__cached_typedefs
+
+    def source_fpath(self, node):
+        '''File the top level node was declared in, if known.'''
+        if self.__cached_decl_fpaths is None:
+            inner = self.__root['inner']
+            self.__cached_decl_fpaths = {id(decl): fpath for decl, fpath
+                in zip(inner, iter_decl_files(inner))}
+        return self.__cached_decl_fpaths.get(id(node.root))
+
+    @property
+    def num_collapsed_redecls(self):
+        self.__decls
+        return self.__num_collapsed_redecls
 
     @property
     def root(self):
         return self.__root
 
+    @property
+    def included_fpaths(self):
+        '''Translated header and every file clang read while parsing it.'''
+        return self.__included_fpaths
+
     @property
     def enums(self):
         if self.__cached_enums is None:
-            self.__cached_enums = list(self.__get_nodes(node_class=C_Enum,
-                configure_fn=self.__config.configure_enum))
+            self.__cached_enums = self.__get_nodes(node_class=C_Enum,
+                configure_fn=self.__config.configure_enums)
         return self.__cached_enums
 
     @property
     def structs(self):
         if self.__cached_structs is None:
-            self.__cached_structs = list(self.__get_nodes(node_class=C_Struct,
-                configure_fn=self.__config.configure_struct))
+            self.__cached_structs = self.__get_nodes(node_class=C_Struct,
+                configure_fn=self.__config.configure_structs)
         return self.__cached_structs
 
     @property
@@ -422,16 +1314,29 @@ class C_TranslationUnit(LoggingObject):
             regular_struct_names = set(s.name for s in self.structs)
             self.__cached_opaque_structs = [s for s in self.__get_nodes(
                 node_class=C_OpaqueStruct,
-                configure_fn=self.__config.configure_opaque_struct
+                configure_fn=self.__config.configure_opaque_structs,
+                prepare_fn=self.__set_handle_types,
             ) if s.name not in regular_struct_names]
         return self.__cached_opaque_structs
 
+    def __set_handle_types(self, opaque_structs):
+        '''Detects "typedef struct Foo_T * Foo;" handles.'''
+        handle_types = {}
+        for name, t in self.typedefs.items():
+            m = re.match(r'^(?:struct|union) (\w+) \*$', t)
+            if m is not None:
+                handle_types.setdefault(m.group(1), name)
+        for struct in opaque_structs:
+            handle_type = handle_types.get(struct.name)
+            if handle_type is not None:
+                struct.set_handle_type(handle_type)
+
     @property
     def functions(self):
         if self.__cached_functions is None:
-            self.__cached_functions = list(self.__get_nodes(
+            self.__cached_functions = self.__get_nodes(
                 node_class=C_Function,
-                configure_fn=self.__config.configure_function))
+                configure_fn=self.__config.configure_functions)
         return self.__cached_functions
 
 
@@ -454,7 +1359,7 @@ class C_Item(object):
 
     @property
     def is_builtin(self):
-        return self.name.startswith('_')
+        return is_builtin_name(self.name)
 
     @property
     def name(self):
@@ -496,10 +1401,15 @@ class C_InnerNode(C_Item):
 
 class C_Enum(C_InnerNode):
 
+    KIND = 'enum'
+
+    @staticmethod
+    def matches(root):
+        return root['kind'] == 'EnumDecl'
+
     @staticmethod
-    def maybe_create(root, **kwargs):
-        if root['kind'] == 'EnumDecl':
-            return C_Enum(root=root, **kwargs)
+    def create(root, **kwargs):
+        return C_Enum(root=root, **kwargs)
 
     @property
     def fields(self):
@@ -559,16 +1469,24 @@ class C_Enum(C_InnerNode):
         return [
             f'module.addEnumeration(make_smart<Enumeration{self.name}>());']
 
+    @property
+    def signature(self):
+        return list(self.fields)
+
 
 class C_Struct(C_InnerNode):
 
+    KIND = 'struct'
+
     def __init__(self, tag, **kwargs):
         super(C_Struct, self).__init__(**kwargs)
-        self.__is_local = True
-        self.__can_copy = True
-        self.__can_move = True
-        self.__can_clone = True
+        # None means derived from is_trivially_copyable.
+        self.__is_local = None
+        self.__can_copy = None
+        self.__can_move = None
+        self.__can_clone = None
         self.__tag = tag
+        self.__cached_fields = None
 
     def set_is_local(self, is_local):
         self.__is_local = is_local
@@ -579,17 +1497,50 @@ class C_Struct(C_InnerNode):
     def set_can_move(self, can_move):
         self.__can_move = can_move
 
-    def set_can_clone(self, can_move):
-        self.__can_move = can_move
+    def set_can_clone(self, can_clone):
+        self.__can_clone = can_clone
+
+    @property
+    def is_trivially_copyable(self):
+        '''Every C struct is trivially copyable, unless it ends with
+        a flexible array member, which sizeof() does not cover. Looks at
+        raw fields, so that ignoring the member in config does not hide it.'''
+        fields = [inner for inner in self.root['inner']
+            if inner['kind'] == 'FieldDecl']
+        if not fields:
+            return True
+        t = fields[-1]['type']
+        return not t.get('desugaredQualType', t['qualType']).endswith('[]')
+
+    @property
+    def is_local(self):
+        return self.__flag(self.__is_local)
+
+    @property
+    def can_copy(self):
+        return self.__flag(self.__can_copy)
+
+    @property
+    def can_move(self):
+        return self.__flag(self.__can_move)
+
+    @property
+    def can_clone(self):
+        return self.__flag(self.__can_clone)
+
+    def __flag(self, value):
+        return self.is_trivially_copyable if value is None else value
 
     @staticmethod
-    def maybe_create(root, **kwargs):
-        if (root['kind'] == 'RecordDecl'
+    def matches(root):
+        return (root['kind'] == 'RecordDecl'
             and root['tagUsed'] in ['struct', 'union']
             and 'inner' in root
-            and 'name' in root
-        ):
-            return C_Struct(root=root, tag=root['tagUsed'], **kwargs)
+            and 'name' in root)
+
+    @staticmethod
+    def create(root, **kwargs):
+        return C_Struct(root=root, tag=root['tagUsed'], **kwargs)
 
     @property
     def is_union(self):
@@ -601,22 +1552,28 @@ class C_Struct(C_InnerNode):
 
     @property
     def fields(self):
-        for inner in self.root['inner']:
-            if inner['kind'] == 'FieldDecl':
-                field = C_StructField(root=inner, config=self.config,
-                    struct=self)
-                self.config.configure_struct_field(field=field)
-                if not field.is_ignored:
-                    yield field
+        if self.__cached_fields is None:
+            fields = [C_StructField(root=inner, config=self.config,
+                struct=self) for inner in self.root['inner']
+                if inner['kind'] == 'FieldDecl']
+            self.config.configure_struct_fields(fields=fields)
+            self.__cached_fields = [field for field in fields
+                if not field.is_ignored]
+        return self.__cached_fields
+
+    @property
+    def signature(self):
+        return [self.__tag, self.is_local, self.can_copy, self.can_move,
+            self.can_clone]
 
     def generate_decl_h(self):
         return [f'MAKE_EXTERNAL_TYPE_FACTORY({self.name}, {self.name});']
 
     def generate_decl_cpp(self):
-        is_local = to_cpp_bool(self.__is_local)
-        can_copy = to_cpp_bool(self.__can_copy)
-        can_move = to_cpp_bool(self.__can_move)
-        can_clone = to_cpp_bool(self.__can_clone)
+        is_local = to_cpp_bool(self.is_local)
+        can_copy = to_cpp_bool(self.can_copy)
+        can_move = to_cpp_bool(self.can_move)
+        can_clone = to_cpp_bool(self.can_clone)
         lines = []
         lines += [
             '',
@@ -630,6 +1587,17 @@ class C_Struct(C_InnerNode):
                f'__forceinline {field.type} {field.getter_name}(const {self.name} &s) {{ return s.{field.name}; }}',
                f'__forceinline void {field.setter_name}({self.name} &s, {field.type} f) {{ s.{field.name} = f; }}',
             ]
+        for field in self.fields:
+            if not field.has_string_accessors:
+                continue
+            lines += [
+                '',
+               f'__forceinline char * {field.getter_name}(const {self.name} &s, Context * context) {{ return dasBinderStringFromArray(context, s.{field.name}, sizeof(s.{field.name})); }}',
+            ]
+            if not field.array_element_type.startswith('const '):
+                lines += [
+                   f'__forceinline void {field.setter_name}({self.name} &s, const char * f) {{ dasBinderCopyString(s.{field.name}, sizeof(s.{field.name}), f); }}',
+                ]
         lines += [
             '',
            f'struct {self.name}Annotation',
@@ -642,6 +1610,10 @@ class C_Struct(C_InnerNode):
                         for f in self.fields
                         if not f.is_bit_field and not f.is_self_ref
         ]
+        lines += [
+           f'        bitfield_{f.das_name} = makeType<{f.type}>(ml);'
+                        for f in self.fields if f.is_bit_field
+        ]
         lines += [
             '    }',
             '    void init() {',
@@ -656,16 +1628,62 @@ class C_Struct(C_InnerNode):
            f'    virtual bool canCopy() const override {{ return {can_copy}; }}',
            f'    virtual bool canMove() const override {{ return {can_move}; }}',
            f'    virtual bool canClone() const override {{ return {can_clone}; }}',
-            '    virtual SimNode * simulateCopy ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {',
-           f'        return context.code->makeNode<SimNode_CopyRefValue>(at, l, r, getSizeOf());',
-            '    }',
-            '    virtual SimNode * simulateClone ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {',
-            '        return simulateCopy(context, at, l, r);',
-            '    }',
+        ]
+        if self.can_copy and self.is_trivially_copyable:
+            lines += [
+                '    virtual SimNode * simulateCopy ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {',
+               f'        return DasBinderCopy<{self.name}>::make(context, at, l, r);',
+                '    }',
+            ]
+        if self.can_clone and self.can_copy and self.is_trivially_copyable:
+            lines += [
+                '    virtual SimNode * simulateClone ( Context & context, const LineInfo & at, SimNode * l, SimNode * r ) const override {',
+                '        return simulateCopy(context, at, l, r);',
+                '    }',
+            ]
+        lines += self.__generate_bitfield_properties()
+        lines += [
             '};'
         ]
         return lines
 
+    def __generate_bitfield_properties(self):
+        '''Bitfields have no address, so they are not added with addField,
+        but are read as properties through inlined getters. Their types
+        are made in the constructor, as the module library passed to it
+        is gone by the time fields are looked up.'''
+        bit_fields = [field for field in self.fields if field.is_bit_field]
+        if not bit_fields:
+            return []
+        lines = []
+        lines += [
+           f'    TypeDeclPtr bitfield_{field.das_name};' for field in bit_fields
+        ]
+        lines += [
+            '    virtual TypeDeclPtr makeFieldType ( const string & na, bool isConst ) const override {',
+        ]
+        for field in bit_fields:
+            lines += [
+               f'        if ( na == "{field.das_name}" ) return make_smart<TypeDecl>(*bitfield_{field.das_name});',
+            ]
+        lines += [
+            '        return ManagedStructureAnnotation::makeFieldType(na, isConst);',
+            '    }',
+        ]
+        for method in ['simulateGetField', 'simulateGetFieldR2V']:
+            lines += [
+               f'    virtual SimNode * {method} ( const string & na, Context & context, const LineInfo & at, const ExpressionPtr & value ) const override {{',
+            ]
+            for field in bit_fields:
+                lines += [
+                   f'        if ( na == "{field.das_name}" ) return context.code->makeNode<SimNode_DasBinderBitfieldGet<{self.name}, {field.type}, &{field.getter_name}>>(at, value->simulate(context));',
+                ]
+            lines += [
+               f'        return ManagedStructureAnnotation::{method}(na, context, at, value);',
+                '    }',
+            ]
+        return lines
+
     def generate_add(self):
         lines = []
         lines += [
@@ -677,20 +1695,36 @@ class C_Struct(C_InnerNode):
             lines += [
                 '',
                f'addExtern<DAS_BIND_FUN({field.getter_name})>(module, lib, "{field.getter_name}",',
-                '    SideEffects::none, "{field.getter_name}");',
+               f'    SideEffects::none, "{field.getter_name}");',
                f'addExtern<DAS_BIND_FUN({field.setter_name})>(module, lib, "{field.setter_name}",',
-                '    SideEffects::modifyArgument, "{field.setter_name}");',
+               f'    SideEffects::modifyArgument, "{field.setter_name}");',
+            ]
+        for field in self.fields:
+            if not field.has_string_accessors:
+                continue
+            lines += [
+                '',
+               f'addExtern<DAS_BIND_FUN({field.getter_name})>(module, lib, "{field.getter_name}",',
+               f'    SideEffects::none, "{field.getter_name}");',
             ]
+            if not field.array_element_type.startswith('const '):
+                lines += [
+                   f'addExtern<DAS_BIND_FUN({field.setter_name})>(module, lib, "{field.setter_name}",',
+                   f'    SideEffects::modifyArgument, "{field.setter_name}");',
+                ]
         return lines
 
 
 class C_OpaqueStruct(C_InnerNode):
 
+    KIND = 'opaque_struct'
+
     def __init__(self, **kwargs):
         super(C_OpaqueStruct, self).__init__(**kwargs)
         self.__annotation_type = 'ManagedValueAnnotation'
         self.__das_type = None
         self.__ptr_type = None
+        self.__handle_type = None
 
     def set_das_type(self, das_type):
         self.__das_type = das_type
@@ -701,18 +1735,37 @@ class C_OpaqueStruct(C_InnerNode):
     def set_annotation_type(self, annotation):
         self.__annotation_type = annotation
 
+    def set_handle_type(self, handle_type):
+        '''Pointer typedef to bind instead of the struct, detected
+        automatically. None binds the struct itself.'''
+        self.__handle_type = handle_type
+
     @staticmethod
-    def maybe_create(root, **kwargs):
-        if (root['kind'] == 'RecordDecl'
+    def matches(root):
+        return (root['kind'] == 'RecordDecl'
             and root['tagUsed'] in ['struct', 'union']
             and 'name' in root
-            and 'inner' not in root
-        ):
-            return C_OpaqueStruct(root=root, **kwargs)
+            and 'inner' not in root)
+
+    @staticmethod
+    def create(root, **kwargs):
+        return C_OpaqueStruct(root=root, **kwargs)
 
     @property
     def das_type(self):
-        return self.__das_type or self.name
+        return self.__das_type or self.__handle_type or self.name
+
+    @property
+    def is_handle(self):
+        '''Bound as pointer sized value with ==, != and is_null().'''
+        return (self.__handle_type is not None
+            and self.das_type == self.__handle_type
+            and self.__annotation_type == 'ManagedValueAnnotation')
+
+    @property
+    def signature(self):
+        return [self.das_type, self.__ptr_type, self.__annotation_type,
+            self.is_handle]
 
     def generate_decl_h(self):
         lines = []
@@ -726,31 +1779,82 @@ class C_OpaqueStruct(C_InnerNode):
         return lines
 
     def generate_decl_cpp(self):
-        return [
-            f'IMPLEMENT_EXTERNAL_TYPE_FACTORY({self.das_type}, {self.das_type})',
+        t = self.das_type
+        lines = []
+        lines += [
+            f'IMPLEMENT_EXTERNAL_TYPE_FACTORY({t}, {t})',
         ]
+        if self.is_handle:
+            lines += [
+                f'__forceinline bool {t}_equ({t} a, {t} b) {{ return a == b; }}',
+                f'__forceinline bool {t}_nequ({t} a, {t} b) {{ return a != b; }}',
+                f'__forceinline bool {t}_is_null({t} a) {{ return a == nullptr; }}',
+            ]
+        return lines
 
     def generate_add(self):
         t = self.das_type
         ann = self.__annotation_type
-        return [
+        lines = []
+        lines += [
             f'module.addAnnotation(make_smart<{ann}<{t}>>("{t}", "{t}"));']
+        if self.is_handle:
+            for das_name, cpp_name in [
+                ('==', f'{t}_equ'),
+                ('!=', f'{t}_nequ'),
+                ('is_null', f'{t}_is_null'),
+            ]:
+                lines += [
+                    f'addExtern<DAS_BIND_FUN({cpp_name}), SimNode_DasBinderFastCall>(module, lib, "{das_name}",',
+                    f'    SideEffects::none, "{cpp_name}");',
+                ]
+        return lines
 
 
 class C_StructField(C_InnerNode):
 
+    KIND = 'field'
+
     def __init__(self, struct, **kwargs):
         super(C_StructField, self).__init__(**kwargs)
         self.__struct = struct
+        self.__string_accessors = None
+
+    def set_string_accessors(self, string_accessors):
+        self.__string_accessors = string_accessors
 
     @property
     def struct(self):
         return self.__struct
 
+    @property
+    def signature(self):
+        return [self.type, self.is_bit_field, self.has_string_accessors]
+
     @property
     def is_array(self):
         return '[' in self.type
 
+    @property
+    def array_element_type(self):
+        '''Type of array elements, e.g. "char" for "char [256]".'''
+        return self.type[:self.type.index('[')].strip()
+
+    @property
+    def has_string_accessors(self):
+        '''Char arrays additionally get a getter and a setter. The getter
+        copies the array into a new string on the context string heap, up
+        to the first zero or the end of the array, so every call allocates.
+        The setter copies a das string into the array, truncated and zero
+        terminated. set_string_accessors(False) turns both off.
+        Other fixed arrays are bound as das fixed arrays, which reference
+        struct memory.'''
+        if not re.match(r'^[^\[]+\[\d+\]$', self.type):
+            return False
+        if self.__string_accessors is None:
+            return self.array_element_type in ['char', 'const char']
+        return self.__string_accessors
+
     @property
     def is_bit_field(self):
         return self.root.get('isBitfield', False)
@@ -770,24 +1874,72 @@ class C_StructField(C_InnerNode):
 
 class C_Function(C_InnerNode):
 
+    KIND = 'function'
+
     def __init__(self, **kwargs):
         super(C_Function, self).__init__(**kwargs)
         self.__side_effects = 'worstDefault'
+        self.__fast_call = None
+        self.__instrumented = None
 
     def set_side_effects(self, side_effects):
         self.__side_effects = side_effects
 
+    def set_fast_call(self, fast_call):
+        self.__fast_call = fast_call
+
+    def set_instrumented(self, instrumented):
+        self.__instrumented = instrumented
+
+    @property
+    def is_instrumented(self):
+        if self.__instrumented is None:
+            return self.config.instrument_calls
+        return self.__instrumented
+
+    @property
+    def can_fast_call(self):
+        '''True if parameters and return value are all scalars or
+        data pointers.'''
+        if '...' in self.type or self.type.count('(') != 1:
+            return False
+        return all(is_c_scalar_type(t) for t in
+            [self.return_type] + [param.type for param in self.params])
+
+    @property
+    def is_fast_call(self):
+        fast_call = self.__fast_call
+        if fast_call is None:
+            fast_call = self.config.use_fast_calls
+        return fast_call and self.can_fast_call
+
     @staticmethod
-    def maybe_create(root, **kwargs):
-        if root['kind'] == 'FunctionDecl':
-            return C_Function(root=root, **kwargs)
+    def matches(root):
+        return root['kind'] == 'FunctionDecl'
+
+    @staticmethod
+    def create(root, **kwargs):
+        return C_Function(root=root, **kwargs)
 
     def generate_add(self):
+        sim_node = ('SimNode_DasBinderFastCall' if self.is_fast_call
+            else 'SimNode_ExtFuncCall')
+        if self.is_instrumented:
+            sim_node = f', DAS_BINDER_CALL_NODE({sim_node})'
+        elif self.is_fast_call:
+            sim_node = f', {sim_node}'
+        else:
+            sim_node = ''
         return [
-            f'addExtern<DAS_BIND_FUN({self.name})>(module, lib, "{self.name}",',
+            f'addExtern<DAS_BIND_FUN({self.name}){sim_node}>(module, lib, "{self.name}",',
             f'    SideEffects::{self.__side_effects}, "{self.name}");',
         ]
 
+    @property
+    def signature(self):
+        return [self.type, self.__side_effects, self.is_fast_call,
+            self.is_instrumented]
+
     @property
     def params(self):
         for inner in self.root['inner']:
@@ -814,34 +1966,46 @@ class C_FunctionParam(C_InnerNode):
 
 class C_HeaderRaw(object):
 
-    def __init__(self, fpath, config):
-        with open(fpath, 'r') as f:
-            self.__header_lines = [line for line in f]
+    def __init__(self, fpath, lines, config, name_filter):
+        self.__header_lines = lines
+        self.__fpath = fpath
         self.__config = config
+        self.__name_filter = name_filter
         self.__cached_macro_consts = None
 
+    @property
+    def fpath(self):
+        return self.__fpath
+
     def __get_items(self, item_class, configure_fn):
+        items = []
         for line in self.__header_lines:
-            with log_on_exception(line=line):
+            try:
                 item = item_class.maybe_create(
                     line=line, config=self.__config)
-                if item is None:
-                    continue
-                configure_fn(item)
-                if not item.is_ignored:
-                    yield item
+            except Exception:
+                log_exception_context(line=line)
+                raise
+            if item is not None and self.__name_filter.accepts(
+                item_class.KIND, item.name
+            ):
+                items.append(item)
+        configure_fn(items)
+        return [item for item in items if not item.is_ignored]
 
     @property
     def macro_consts(self):
         if self.__cached_macro_consts is None:
-            self.__cached_macro_consts = list(self.__get_items(
+            self.__cached_macro_consts = self.__get_items(
                 item_class=C_MacroConst,
-                configure_fn=self.__config.configure_macro_const))
+                configure_fn=self.__config.configure_macro_consts)
         return self.__cached_macro_consts
 
 
 class C_MacroConst(C_Item):
 
+    KIND = 'macro_const'
+
     def __init__(self, name, value, **kwargs):
         super(C_MacroConst, self).__init__(**kwargs)
         self.__name = name
@@ -860,12 +2024,306 @@ class C_MacroConst(C_Item):
         value = re.sub(r'//.*$', '', value)
         return C_MacroConst(name=name, value=value, **kwargs)
 
+    @property
+    def signature(self):
+        return self.value
+
     def generate_add(self):
         return [
             f'addConstant(module, "{self.name}", {self.value});'
         ]
 
 
+AST_SNAPSHOT_DECL_KINDS = {
+    'EnumDecl', 'EnumConstantDecl',
+    'RecordDecl', 'FieldDecl',
+    'FunctionDecl', 'ParmVarDecl',
+    'TypedefDecl',
+}
+
+AST_SNAPSHOT_KEYS = {
+    'id', 'kind', 'name', 'type', 'inner', 'tagUsed', 'previousDecl',
+    'completeDefinition', 'definitionData', 'isBitfield', 'isImplicit',
+}
+
+def iter_decl_files(decls, last_file=None):
+    '''
+    Yields source file of each decl. Clang JSON dump writes "file" only
+    when it differs from the previously written location, so the whole
+    tree has to be walked in dump order to track it.
+
+    >>> decls = [{'loc': {'file': 'a.h'}, 'inner': [{'loc': {},
+    ...     'range': {'end': {'file': 'b.h'}}}]}, {'loc': {}}]
+    >>> list(iter_decl_files(decls))
+    ['a.h', 'b.h']
+    '''
+    def update(loc, last_file):
+        if 'spellingLoc' in loc:
+            last_file = loc['spellingLoc'].get('file', last_file)
+            return loc['expansionLoc'].get('file', last_file)
+        return loc.get('file', last_file)
+    def walk(node, last_file):
+        last_file = update(node.get('loc', {}), last_file)
+        decl_file = last_file
+        for key in ['begin', 'end']:
+            last_file = update(node.get('range', {}).get(key, {}), last_file)
+        for inner in node.get('inner', []):
+            _, last_file = walk(inner, last_file)
+        return decl_file, last_file
+    for decl in decls:
+        decl_file, last_file = walk(decl, last_file)
+        yield decl_file
+
+def prune_ast(root):
+    '''
+    Keeps only decls and keys the binder uses. Source file is stored
+    explicitly in every top level decl.
+
+    >>> prune_ast({'kind': 'TranslationUnitDecl', 'inner': [
+    ...     {'kind': 'EnumDecl', 'name': 'E', 'loc': {'file': 'a.h'},
+    ...         'range': {}, 'inner': [{'kind': 'FullComment'}]},
+    ...     {'kind': 'VarDecl', 'name': 'v', 'loc': {'file': 'b.h'}}]})
+    {'kind': 'TranslationUnitDecl', 'inner': [{'kind': 'EnumDecl', 'name': 'E', 'inner': [], 'loc': {'file': 'a.h'}}]}
+    '''
+    def prune(node):
+        pruned = {key: value for key, value in node.items()
+            if key in AST_SNAPSHOT_KEYS and key != 'inner'}
+        if 'inner' in node:
+            pruned['inner'] = [prune(inner) for inner in node['inner']
+                if inner['kind'] in AST_SNAPSHOT_DECL_KINDS]
+        return pruned
+    inner = []
+    for decl, decl_file in zip(root['inner'], iter_decl_files(root['inner'])):
+        if decl['kind'] in AST_SNAPSHOT_DECL_KINDS:
+            pruned = prune(decl)
+            if decl_file is not None:
+                pruned['loc'] = {'file': decl_file}
+            inner.append(pruned)
+    return {'kind': root['kind'], 'inner': inner}
+
+def is_builtin_name(name):
+    '''Names starting with underscore belong to the compiler and libc.'''
+    return name.startswith('_')
+
+def classify_decls(decls, node_classes, name_filter):
+    '''
+    Finds decls each node class matches, looking only at raw decl keys so
+    that no nodes are built. Returns node kind to list of decl indices in
+    source order.
+    '''
+    accepts = name_filter.accepts
+    classified = {}
+    for i, inner in enumerate(decls):
+        name = inner.get('name')
+        for node_class in node_classes:
+            kind = node_class.KIND
+            if name is not None and not accepts(kind, name):
+                continue
+            try:
+                if (not node_class.matches(inner)
+                    or is_builtin_name(inner['name'])
+                ):
+                    continue
+            except Exception:
+                log_exception_context(inner=inner)
+                raise
+            classified.setdefault(kind, []).append(i)
+            break
+    return classified
+
+def dedupe_decls(decls):
+    '''
+    Keeps one decl per redeclaration chain (decls linked by previousDecl):
+    the first one with "inner" (a definition or a prototype with
+    parameters), or the first one if none has it. Returns kept decls in
+    their original order and number of dropped ones.
+
+    >>> decls, n = dedupe_decls([
+    ...     {'id': '0x1', 'name': 'S'},
+    ...     {'id': '0x2', 'name': 'S', 'previousDecl': '0x1'},
+    ...     {'id': '0x3', 'name': 'f', 'inner': []},
+    ...     {'id': '0x4', 'name': 'S', 'previousDecl': '0x2', 'inner': []},
+    ...     {'name': 'no_id'}])
+    >>> [d.get('id') for d in decls], n
+    (['0x3', '0x4', None], 2)
+    '''
+    canonical_ids = {}
+    def canonical_id(decl):
+        decl_id = decl.get('id')
+        prev_id = decl.get('previousDecl')
+        canonical = canonical_ids.get(prev_id, prev_id) or decl_id
+        canonical_ids[decl_id] = canonical
+        return canonical
+    best = {}
+    for i, decl in enumerate(decls):
+        key = canonical_id(decl) if 'id' in decl else ('no_id', i)
+        if key not in best or ('inner' in decl
+            and 'inner' not in decls[best[key]]
+        ):
+            best[key] = i
+    kept = sorted(best.values())
+    return [decls[i] for i in kept], len(decls) - len(kept)
+
+def import_libclang():
+    try:
+        import clang.cindex
+    except ImportError:
+        return None
+    return clang.cindex
+
+def cursor_to_ast_node(cursor, cindex):
+    '''
+    Converts libclang cursor to the same dict clang JSON dump has for it,
+    limited to AST_SNAPSHOT_DECL_KINDS and AST_SNAPSHOT_KEYS. Returns None
+    for cursors of other kinds.
+    '''
+    kinds = cindex.CursorKind
+    kind = {
+        kinds.ENUM_DECL: 'EnumDecl',
+        kinds.ENUM_CONSTANT_DECL: 'EnumConstantDecl',
+        kinds.STRUCT_DECL: 'RecordDecl',
+        kinds.UNION_DECL: 'RecordDecl',
+        kinds.FIELD_DECL: 'FieldDecl',
+        kinds.FUNCTION_DECL: 'FunctionDecl',
+        kinds.PARM_DECL: 'ParmVarDecl',
+        kinds.TYPEDEF_DECL: 'TypedefDecl',
+    }.get(cursor.kind)
+    if kind is None:
+        return None
+    node = {'id': cursor_ast_id(cursor), 'kind': kind}
+    # libclang spells "typedef struct {...} T" record as "T", while its
+    # type is spelled "T" rather than "struct T". JSON dump has no name.
+    typedef_named = (kind in ['RecordDecl', 'EnumDecl']
+        and cursor.type.spelling == cursor.spelling)
+    if (cursor.spelling and not cursor.is_anonymous() and not typedef_named
+        and not re.search(r'\((anonymous|unnamed) ', cursor.spelling)
+    ):
+        node['name'] = cursor.spelling
+    canonical = cursor.canonical
+    if canonical != cursor:
+        node['previousDecl'] = cursor_ast_id(canonical)
+    if kind == 'RecordDecl':
+        node['tagUsed'] = ('union' if cursor.kind == kinds.UNION_DECL
+            else 'struct')
+        if cursor.is_definition():
+            node['completeDefinition'] = True
+    elif kind == 'TypedefDecl':
+        node['type'] = libclang_qual_type(cursor.underlying_typedef_type,
+            cindex)
+    elif kind != 'EnumDecl':
+        node['type'] = libclang_qual_type(cursor.type, cindex)
+    if kind == 'FieldDecl' and cursor.is_bitfield():
+        node['isBitfield'] = True
+    inner = [inner_node for inner_node in (cursor_to_ast_node(child, cindex)
+        for child in cursor.get_children()) if inner_node is not None]
+    if inner:
+        node['inner'] = inner
+    if cursor.location.file is not None:
+        node['loc'] = {'file': cursor.location.file.name}
+    return node
+
+def cursor_ast_id(cursor):
+    '''
+    Decl id built from USR and location, so unlike 32 bit cursor.hash it
+    does not collide on large headers. Redeclarations differ by location,
+    decls expanded from one macro by USR.
+    '''
+    location = cursor.location
+    fname = location.file.name if location.file is not None else ''
+    return f'{cursor.get_usr()}@{fname}:{location.offset}'
+
+def find_duplicate_ids(decls):
+    '''
+    Returns ids shared by decls that are not redeclarations of each other.
+    A header without include guard included twice gives the same decl
+    twice, linked by previousDecl, which is fine.
+
+    >>> find_duplicate_ids([{'id': 'a'}, {'id': 'b'},
+    ...     {'id': 'a', 'previousDecl': 'a'}])
+    []
+    >>> find_duplicate_ids([{'id': 'a'}, {'id': 'b'}, {'id': 'a'}])
+    ['a']
+    '''
+    seen = set()
+    duplicates = []
+    for decl in decls:
+        decl_id = decl.get('id')
+        if decl_id in seen and decl.get('previousDecl') != decl_id:
+            duplicates.append(decl_id)
+        seen.add(decl_id)
+    return duplicates
+
+def libclang_qual_type(t, cindex):
+    '''Like clang JSON dump: desugars top level typedefs only.'''
+    qual_type = {'qualType': t.spelling}
+    desugared = t
+    while True:
+        if desugared.kind == cindex.TypeKind.TYPEDEF:
+            desugared = desugared.get_declaration().underlying_typedef_type
+        elif desugared.kind == cindex.TypeKind.ELABORATED:
+            desugared = desugared.get_named_type()
+        else:
+            break
+    if desugared != t:
+        spelling = desugared.spelling
+        if t.is_const_qualified() and not desugared.is_const_qualified():
+            if desugared.kind == cindex.TypeKind.POINTER:
+                spelling += 'const'
+            else:
+                spelling = 'const ' + spelling
+        qual_type['desugaredQualType'] = spelling
+    return qual_type
+
+def open_ast_snapshot(fpath, mode):
+    if fpath.endswith('.gz'):
+        import gzip
+        return gzip.open(fpath, mode)
+    if fpath.endswith('.xz'):
+        import lzma
+        return lzma.open(fpath, mode)
+    return open(fpath, mode)
+
+def save_ast_snapshot(root, fpath):
+    root = prune_ast(root)
+    make_dirs(path.dirname(fpath))
+    if '.pickle' in path.basename(fpath):
+        import pickle
+        with open_ast_snapshot(fpath, 'wb') as f:
+            pickle.dump(root, f, protocol=pickle.HIGHEST_PROTOCOL)
+    else:
+        import json
+        with open_ast_snapshot(fpath, 'wt') as f:
+            json.dump(root, f, separators=(',', ':'))
+
+def load_ast_snapshot(fpath):
+    try:
+        if '.pickle' in path.basename(fpath):
+            import pickle
+            with open_ast_snapshot(fpath, 'rb') as f:
+                return pickle.load(f)
+        import json
+        with open_ast_snapshot(fpath, 'rt') as f:
+            return json.load(f)
+    except (OSError, EOFError, ValueError) as e:
+        raise BinderError(f'Could not read AST snapshot {fpath}: {e}')
+
+def is_c_scalar_type(c_type):
+    '''
+    >>> [is_c_scalar_type(t) for t in ['const int', 'struct Foo *',
+    ...     'struct Foo', 'enum Bar', 'void (*)(int)', 'float [4]']]
+    [True, True, False, False, False, False]
+    '''
+    if '(' in c_type or '[' in c_type:
+        return False
+    if c_type.endswith('*'):
+        return True
+    return ' '.join(w for w in c_type.split()
+        if w not in ['const', 'volatile']) in C_SCALAR_TYPES
+
+def read_lines(fpath):
+    with open(fpath, 'r') as f:
+        return [line for line in f]
+
 def to_cpp_bool(b):
     return {True: 'true', False: 'false'}[b]
 
@@ -873,6 +2331,38 @@ def remove_last_char(lines, char):
     if lines[-1].endswith(char):
         lines[-1] = lines[-1][:-1]
 
+def main_dependency_message(main):
+    '''
+    Explains why main module can not use types of shards.
+
+    >>> main, a = ModuleShard('main', ''), ModuleShard('a', '_a')
+    >>> main.dependency_causes[a] = 'H used by f'
+    >>> print(main_dependency_message(main))
+    Main module main must not use types of shards, but requires a for H used by f. Move symbols using them into a shard as well.
+    '''
+    causes = [f'{dep.das_module_name} for {cause}'
+        for dep, cause in main.dependency_causes.items()]
+    return (f'Main module {main.das_module_name} must not use types of '
+        f'shards, but requires {", ".join(causes)}. Move symbols using '
+        f'them into a shard as well.')
+
+def shard_cycle_message(cycle):
+    '''
+    Explains dependency cycle given as list of shards, first one repeated
+    at the end.
+
+    >>> a, b = ModuleShard('a', '_a'), ModuleShard('b', '_b')
+    >>> a.dependency_causes[b] = 'H used by f'
+    >>> b.dependency_causes[a] = 'E used by g'
+    >>> print(shard_cycle_message([a, b, a]))
+    Generated modules depend on each other: a requires b for H used by f, b requires a for E used by g. Move shared types into a separate shard.
+    '''
+    steps = [f'{shard.das_module_name} requires {dep.das_module_name} for '
+        f'{shard.dependency_causes[dep]}'
+        for shard, dep in zip(cycle, cycle[1:])]
+    return (f'Generated modules depend on each other: {", ".join(steps)}. '
+        f'Move shared types into a separate shard.')
+
 def split_to_parts(xs, parts):
     '''
     >>> a = 'some string to split'
@@ -886,3 +2376,59 @@ def split_to_parts(xs, parts):
     return [xs[(len(xs)* n   ) // parts :
                (len(xs)*(n+1)) // parts
     ] for n in range(parts) ]
+
+def diff_manifests(old, new):
+    '''
+    Yields "+ symbol", "- symbol" and "~ symbol" for added, removed and
+    changed symbols.
+
+    >>> old = {'symbols': {'enum:A': {'part': 0, 'digest': '1'},
+    ...     'function:f': {'part': 0, 'digest': '2'}}}
+    >>> new = {'symbols': {'enum:A': {'part': 1, 'digest': '1'},
+    ...     'function:f': {'part': 0, 'digest': '3'},
+    ...     'struct:S': {'part': 0, 'digest': '4'}}}
+    >>> list(diff_manifests(old, new))
+    ['+ struct:S', '~ function:f']
+    '''
+    old_symbols = old['symbols']
+    new_symbols = new['symbols']
+    for name in sorted(new_symbols.keys() - old_symbols.keys()):
+        yield f'+ {name}'
+    for name in sorted(old_symbols.keys() - new_symbols.keys()):
+        yield f'- {name}'
+    for name in sorted(old_symbols.keys() & new_symbols.keys()):
+        old_symbol = old_symbols[name]
+        new_symbol = new_symbols[name]
+        if (old_symbol['digest'] != new_symbol['digest']
+            or old_symbol.get('module') != new_symbol.get('module')
+        ):
+            yield f'~ {name}'
+
+def parse_make_deps(text):
+    r'''
+    Returns prerequisites listed in a Makefile style depfile.
+
+    >>> parse_make_deps('a.o: a.h \\\n  b\\ c.h C:\\d.h\n')
+    ['a.h', 'b c.h', 'C:\\d.h']
+    '''
+    deps = []
+    for line in text.replace('\\\n', ' ').splitlines():
+        _, sep, prerequisites = line.partition(': ')
+        if not sep:
+            continue
+        for dep in re.findall(r'(?:\\ |\S)+', prerequisites):
+            deps.append(dep.replace('\\ ', ' ').replace('\\#', '#').replace(
+                '$$', '$'))
+    return deps
+
+def format_make_deps(target, deps):
+    r'''
+    >>> print(format_make_deps('out.h', ['a.h', 'b c.h']), end='')
+    out.h: \
+      a.h \
+      b\ c.h
+    '''
+    escape = lambda p: p.replace('$', '$$').replace('#', '\\#').replace(
+        ' ', '\\ ')
+    return ' \\\n  '.join([f'{escape(target)}:'] + list(map(escape, deps))
+        ) + '\n'
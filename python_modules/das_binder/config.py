@@ -1,3 +1,41 @@
+import fnmatch
+from das_shared.diag import log_exception_context
+
+
+class NameRules(object):
+    '''Names to match: exact names, prefixes, shell-style globs and
+    regexes (regexes must match the whole name).'''
+
+    def __init__(self, names=(), prefixes=(), globs=(), regexes=()):
+        self.names = frozenset(names)
+        self.prefixes = tuple(prefixes)
+        self.globs = tuple(globs)
+        self.regexes = tuple(regexes)
+
+
+class Shard(object):
+    '''Moves matching symbols into a separate das module: by name prefix,
+    by shell-style glob of the source file path, or by predicate taking
+    the node. A symbol goes to the first shard with any matching rule,
+    fields stay with their struct.'''
+
+    def __init__(self, das_module_name, prefixes=(), files=(),
+        predicate=None
+    ):
+        self.das_module_name = das_module_name
+        self.prefixes = tuple(prefixes)
+        self.files = tuple(files)
+        self.predicate = predicate
+
+    def matches(self, node, fpath):
+        if node.name.startswith(self.prefixes):
+            return True
+        if fpath is not None and self.files:
+            if any(fnmatch.fnmatch(fpath, glob) for glob in self.files):
+                return True
+        return self.predicate is not None and self.predicate(node)
+
+
 class ConfigBase(object):
 
     @property
@@ -9,6 +47,53 @@ class ConfigBase(object):
     def c_headers_to_extract_defines_from(self):
         return []
 
+    @property
+    def c_headers_to_extract_macro_consts_from(self):
+        '''Headers to scan for "#define NAME value" constants.'''
+        return []
+
+    @property
+    def include_rules(self):
+        '''Maps node kind ("enum", "struct", "opaque_struct", "function",
+        "macro_const") to NameRules. If present for a kind, only decls with
+        matching names are considered.'''
+        return {}
+
+    @property
+    def exclude_rules(self):
+        '''Maps node kind to NameRules of decls to skip. Unlike ignore(),
+        these are applied before any node is created.'''
+        return {}
+
+    @property
+    def shards(self):
+        '''List of Shard. Each one becomes GeneratedModule_{name} next to
+        the main module, to be registered the same way, after the shards
+        it requires. Symbols matching no shard stay in the main module.
+        Shards may use types of the main module and of other shards, but
+        the main module must not use types of shards, the binder fails
+        otherwise. Keep functions and struct fields using shard types in
+        that shard too.'''
+        return []
+
+    @property
+    def use_fast_calls(self):
+        '''Bind functions whose parameters and return value are all
+        scalars or pointers through SimNode_DasBinderFastCall, which
+        evaluates arguments as native values instead of going through
+        vec4f and generic casts. Can be overridden per function with
+        set_fast_call().'''
+        return False
+
+    @property
+    def instrument_calls(self):
+        '''Bind functions through a node that counts calls and time spent
+        in them, when generated code is compiled with
+        DAS_BINDER_INSTRUMENT defined. Stats can be printed from daScript
+        with das_binder_dump_call_stats(). Can be overridden per function
+        with set_instrumented().'''
+        return False
+
     def custom_pass(self, context):
         '''Can generate extra files here.'''
         pass
@@ -25,18 +110,64 @@ class ConfigBase(object):
         '''This function is called for each encountered enum.'''
         pass
 
+    def configure_enums(self, enums):
+        '''This function is called once with all encountered enums.
+        By default calls configure_enum for each of them.'''
+        configure_each(self.configure_enum, enums)
+
     def configure_struct(self, struct):
         '''This function is called for each encountered struct.'''
         pass
 
+    def configure_structs(self, structs):
+        '''This function is called once with all encountered structs.
+        By default calls configure_struct for each of them.'''
+        configure_each(self.configure_struct, structs)
+
     def configure_opaque_struct(self, struct):
         '''This function is called for each encountered opaque struct.'''
         pass
 
+    def configure_opaque_structs(self, structs):
+        '''This function is called once with all encountered opaque structs.
+        By default calls configure_opaque_struct for each of them.'''
+        configure_each(self.configure_opaque_struct, structs)
+
     def configure_struct_field(self, field):
         '''This function is called for each field in each struct.'''
         pass
 
+    def configure_struct_fields(self, fields):
+        '''This function is called once with all fields of a struct.
+        By default calls configure_struct_field for each of them.'''
+        configure_each(self.configure_struct_field, fields)
+
     def configure_function(self, function):
         '''This function is called for each function.'''
         pass
+
+    def configure_functions(self, functions):
+        '''This function is called once with all encountered functions.
+        By default calls configure_function for each of them.'''
+        configure_each(self.configure_function, functions)
+
+    def configure_macro_const(self, macro_const):
+        '''This function is called for each encountered macro constant.'''
+        pass
+
+    def configure_macro_consts(self, macro_consts):
+        '''This function is called once with all macro constants of a header.
+        By default calls configure_macro_const for each of them.'''
+        configure_each(self.configure_macro_const, macro_consts)
+
+
+def configure_each(configure_fn, items):
+    '''Calls configure_fn for every item, logging the hook and the item it
+    failed on.'''
+    for item in items:
+        try:
+            configure_fn(item)
+        except Exception:
+            log_exception_context(configure_fn=configure_fn.__name__,
+                node=getattr(item, 'root', item.name))
+            raise
@@ -1,7 +1,9 @@
 import sys
-import doctest
+import logging
 from os import path
 
+SKIP_SELF_TESTS_ARG = '--skip_self_tests'
+
 if __name__ == '__main__':
     sys.path += [
         path.join(path.dirname(__file__), '..'),
@@ -9,6 +11,14 @@ if __name__ == '__main__':
             '..', 'dasShared', 'python_modules'),
     ]
     import binder
-    from binder import Binder
-    doctest.testmod(binder)
-    binder.Binder(argv=sys.argv).run()
+    from binder import Settings, run_binders
+    if SKIP_SELF_TESTS_ARG not in sys.argv:
+        # doctest is the slowest import by far, production builds skip it.
+        import doctest
+        doctest.testmod(binder)
+    settings = Settings(argv=sys.argv[1:])
+    logging.basicConfig(level=settings.log_level,
+        format='%(asctime)s [%(levelname)s:%(name)s] %(message)s')
+    for result in run_binders(settings=settings):
+        for line in result.diff or []:
+            print(line)